@@ -1,10 +1,14 @@
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+import scipy.sparse
 import matplotlib
 import matplotlib.pyplot as plt
 import networkx as nx
 from .utils import *
+from .utils.corrAnalysis import _bootstrapPairs, _pvalues
 
 
 class Edge:
@@ -13,37 +17,63 @@ class Edge:
         Initial_Parameters
         ----------
         peaktable : Pandas dataframe containing peak data. Must contain 'Name' and 'Label'.
-        datatable : Pandas dataframe matrix containing scores
-        pvalues : Pandas dataframe matrix containing score/similarity pvalues (if available, otherwise set to None)
+        datatable : Pandas dataframe matrix containing scores, or a condensedMatrix, scipy sparse matrix or square numpy array/memmap of symmetric scores. Sparse and numpy matrices are read in place, so memory follows the stored (non-zero) scores rather than the full matrix, and pairs not stored in a sparse matrix have no edge.
+        pvalues : Pandas dataframe matrix containing score/similarity pvalues, or a matrix of the same type as datatable (a sparse datatable takes a numpy array or a sparse matrix storing the same pairs) (if available, otherwise set to None)
+        names : The row/column names of a scipy sparse or numpy array/memmap datatable (default: None uses the peaktable 'Name' column order)
 
         Methods
         -------
         set_params : Set parameters
-            filter_type: The value type to filter the data on (default: 'pvalue')
-            hard_threshold: Value to filter the data on (default: 0.005)
+            filter_type: The value type to filter the data on ('pvalue', 'qvalue' or 'score'). Qvalues are Benjamini-Hochberg adjusted pvalues and are added to the edges as a 'qvalue' column (default: 'pvalue')
+            hard_threshold: Value to filter the data on, or a dictionary of values keyed by 'pvalue', 'qvalue' and/or 'score' to filter on several at once, e.g. {'pvalue': 0.05, 'score': 0.3} keeps pvalue < 0.05 and |score| > 0.3 (default: 0.005)
             withinBlocks: Include scores within blocks if building multi-block network (default: False)
             sign: The sign of the score/similarity to filter on ('pos', 'neg' or 'both') (default: 'both')
+            block_thresholds: A dictionary of hard_threshold values for particular pairs of blocks, keyed by (block, block) tuples, in place of hard_threshold (default: None)
+            k_nearest: Keep only the k strongest of each node's edges passing the filter, ranked on the score in the direction of sign (default: None keeps every edge)
+            mutual: Keep an edge only if it is among the k strongest edges of both of its nodes, when k_nearest is set (default: False)
+            n_jobs: The number of threads to index the block pairs and run the stability resamples on (-1 uses all processors) (default: 1)
+            qvalue_scope: Adjust the pvalues for multiple testing over all of the tested pairs at once ('global') or over each pair of blocks separately ('block') (default: 'global')
 
         help : Print this help text
 
-        build : Builds the nodes and edges.
+        build : Builds the nodes and edges. Candidate pairs are kept in an index sorted on the threshold, so rebuilding after a tighter threshold or a different sign is a binary search rather than a new scan.
+        threshold_curve : Returns a Pandas dataframe of the edge count, node count and density of the network at each of a list of thresholds on filter_type (default thresholds: 0 to 0.95 for scores, 1e-10 to 1 for pvalues and qvalues).
+        writeEdges : Streams the edges to a CSV or Parquet file one block of rows at a time, for matrices (such as memory-mapped corrAnalysis results) whose edges do not fit in memory.
+        stability : Resamples the rows of a Pandas dataframe of sample values (with a column for each node) n_bootstraps times (default: 100), recomputes the correlation (correlationType 'pearson' or 'spearman', default: 'pearson') of every edge in each resample and adds the fraction of resamples in which the edge passes the filter thresholds and sign as a 'stability' column of the edges. The resamples run in chunks on n_jobs threads. Returns the edges.
         getNodes : Returns a Pandas dataframe of all nodes.
-        getEdges : Returns a Pandas dataframe of all edges.
+        getEdges : Returns a Pandas dataframe of all edges, with the node names and labels on every edge.
+        getCompactEdges : Returns a compact Pandas dataframe of all edges, with int32 node indexes (into getNodes), categorical blocks, float32 scores and pvalues and int8 signs.
     """
 
-    def __init__(self, peaktable, datatable, pvalues):
+    def __init__(self, peaktable, datatable, pvalues, names=None):
 
         peaktable = self.__checkPeakTable(self.__checkData(peaktable))
-        datatable = self.__checkData(datatable)
 
-        if pvalues is not None:
-            pvalues = self.__checkData(pvalues)
+        # Sparse, numpy (including memory-mapped) and condensed matrices are matched to the peaks through integer
+        # positions, so they are read where they are rather than reindexed into a dataframe
+        if self.__isMatrix(datatable):
+            peaktable, matrix = self.__checkMatrix(peaktable, datatable, pvalues, names)
+            positions = None
+        else:
+            datatable = self.__checkData(datatable, peaktable['Name'])
+
+            if pvalues is not None:
+                pvalues = self.__checkData(pvalues, peaktable['Name'])
 
-        peaktable, datatable, pvalues = self.__checkDataIntersect(peaktable, datatable, pvalues)
+            peaktable, datatable, pvalues = self.__checkDataIntersect(peaktable, datatable, pvalues)
+            positions = self.__namePositions(peaktable, datatable)
+            matrix = None
 
         self.__peaktable = peaktable
         self.__datatable = datatable
         self.__pvalues = pvalues
+        self.__matrix = matrix
+        self.__positions = positions
+
+        self.__index = None
+        self.__selection = None
+        self.__stability = None
+        self.__block_peaks = None
 
         self.__setNodes(pd.DataFrame())
         self.__setEdges(pd.DataFrame())
@@ -53,91 +83,182 @@ class Edge:
     def help(self):
         print(Edge.usage)
 
-    def set_params(self, filter_type='pvalue', hard_threshold=0.005, withinBlocks=False, sign='both'):
+    def set_params(self, filter_type='pvalue', hard_threshold=0.005, withinBlocks=False, sign='both', block_thresholds=None, k_nearest=None, mutual=False, n_jobs=1, qvalue_scope='global'):
+
+        filter_type, hard_threshold, withinBlocks, sign, block_thresholds = self.__paramCheck(filter_type, hard_threshold,
+                                                                                              withinBlocks, sign,
+                                                                                              block_thresholds)
+        k_nearest, mutual = self.__nearestCheck(k_nearest, mutual)
 
-        filter_type, hard_threshold, withinBlocks, sign = self.__paramCheck(filter_type, hard_threshold, withinBlocks,
-                                                                            sign)
+        if not isinstance(n_jobs, int) or n_jobs == 0 or n_jobs < -1:
+            print("Error: n_jobs is not valid. Choose a positive integer or -1 to use all processors.")
+            sys.exit()
+
+        if qvalue_scope.lower() not in ["global", "block"]:
+            print("Error: qvalue_scope is not valid. Choose either \"global\" or \"block\".")
+            sys.exit()
 
         self.__filter_type = filter_type;
         self.__hard_threshold = hard_threshold;
         self.__withinBlocks = withinBlocks;
         self.__sign = sign;
+        self.__block_thresholds = block_thresholds;
+        self.__k_nearest = k_nearest;
+        self.__mutual = mutual;
+        self.__n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs;
+        self.__qvalue_scope = qvalue_scope.lower();
 
     def build(self):
 
-        peaktable = self.__peaktable
-        datatable = self.__datatable
-        pvalues = self.__pvalues
+        # Pairs are only rescanned when the thresholds go beyond the sweep index, otherwise they are found by binary search
+        if not self.__indexCovers():
+            self.__buildIndex()
 
-        filter_type = self.__filter_type
-        hard_threshold = self.__hard_threshold
-        sign = self.__sign
+        selection = [self.__segmentSelection(segment) for segment in self.__index['segments']]
 
-        nodes = pd.DataFrame();
-        edges = pd.DataFrame();
+        nearest = None
 
-        if 'Block' in peaktable.columns:
-            index_blocks = peaktable[peaktable['Name'].isin(list(datatable.index))].Block.unique()
-            column_blocks = peaktable[peaktable['Name'].isin(list(datatable.columns))].Block.unique()
+        if self.__k_nearest is not None:
+            score, start_indexes, end_indexes, _, _ = self.__selectionArrays(selection)
+            nearest = self.__nearestMask(score, start_indexes, end_indexes)
+
+        # Only the selected index positions are kept. The wide edge table is built when it is first asked for.
+        self.__selection = (selection, nearest)
+        self.__stability = None
+
+        self.__setNodes(self.__index['nodes'])
+        self.__setEdges(None)
+
+    def threshold_curve(self, thresholds=None, filter_type=None):
+
+        pvalues_available = self.__pvalues is not None
+
+        if filter_type is None:
+            filter_type = self.__filter_type if pvalues_available else 'score'
+
+        if filter_type.lower() not in ["pvalue", "qvalue", "score"] or (filter_type.lower() != "score" and not pvalues_available):
+            print("Error: Filter type not valid. Choose either \"Pvalue\" or \"Qvalue\" (if pvalues are available) or \"Score\".")
+            sys.exit()
+
+        key = filter_type.lower()
+
+        if thresholds is None:
+            thresholds = np.logspace(-10, 0, 11) if key != "score" else np.round(np.linspace(0, 0.95, 20), 2)
+
+        thresholds = np.asarray(thresholds, dtype=float)
+        values = self.__sweepValue(key, thresholds)
+
+        # One index, bounded by the loosest threshold, answers every threshold of the curve
+        if not self.__indexCovers((key, values.max())):
+            self.__buildIndex((key, values.max()))
+
+        sweep = []
+        node_ids = []
+
+        for segment in self.__index['segments']:
+            order = segment['order'][self.__signMask(segment['score'][segment['order']])]
+
+            sweep.append(segment['sweep'][order])
+            node_ids.append(np.column_stack([segment['start_indexes'][segment['rows'][order]],
+                                             segment['end_indexes'][segment['cols'][order]]]))
+
+        sweep = np.concatenate(sweep) if len(sweep) > 0 else np.empty(0)
+        node_ids = np.concatenate(node_ids) if len(node_ids) > 0 else np.empty((0, 2), dtype=int)
+
+        order = np.argsort(sweep, kind='stable')
+        sweep = sweep[order]
+
+        # A node joins the network at the first (strongest) edge it appears in
+        _, node_positions = np.unique(node_ids[order].ravel(), return_inverse=True)
+        first = np.full(node_positions.max() + 1 if len(node_positions) > 0 else 0, len(sweep))
+        np.minimum.at(first, node_positions.ravel(), np.repeat(np.arange(len(sweep)), 2))
+        first = np.sort(first)
+
+        edge_counts = np.searchsorted(sweep, values, side='left')
+        node_counts = np.searchsorted(first, edge_counts, side='left')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            density = np.where(node_counts > 1, 2 * edge_counts / (node_counts * (node_counts - 1.)), 0.0)
+
+        return pd.DataFrame({'threshold': thresholds, 'edges': edge_counts, 'nodes': node_counts, 'density': density})
+
+    def writeEdges(self, path, file_format=None, memory_limit=1024):
+
+        file_format, memory_limit = self.__writeCheck(path, file_format, memory_limit)
+
+        if self.__matrix is not None:
+            chunks = self.__matrixEdgeChunks(memory_limit)
         else:
-            index_blocks = ['#no_multiple_blocks']
-            column_blocks = ['#no_multiple_blocks']
+            chunks = self.__tableEdgeChunks(memory_limit)
 
-        for idx, index_block in enumerate(index_blocks):
+        columns = self.__edgeColumns('Block' in self.__peaktable.columns, self.__pvalues is not None)
+        writer = None
+        count = 0
 
-            nodes, scoreBlocks_index, pvalBlocks_index = self.__scoreBlockIndex(nodes, peaktable, datatable, pvalues,
-                                                                                index_blocks, index_block)
+        for edges in chunks:
+            if len(edges) > 0:
+                writer = self.__writeChunk(writer, path, file_format, edges)
 
-            if set(list(datatable.index)) == set(list(datatable.columns)):
-                iter_idx = idx;
-            else:
-                iter_idx = 0;
+            columns = list(edges.columns)
+            count += len(edges)
 
-            for column_block in column_blocks[iter_idx:]:
+        # A file without edges still gets the column header
+        if writer is None:
+            writer = self.__writeChunk(writer, path, file_format, pd.DataFrame([], columns=columns))
 
-                if pvalues is None:
-                    filter_type = 'score';
+        if file_format == "parquet":
+            writer.close()
 
-                if self.__withinBlocks:
+        return count
 
-                    nodes, scoreBlocks_column, pvalBlocks_column = self.__scoreBlockColumn(nodes, peaktable,
-                                                                                           scoreBlocks_index,
-                                                                                           pvalBlocks_index,
-                                                                                           column_blocks, column_block);
+    def stability(self, df_data, correlationType='pearson', n_bootstraps=100, seed=None, memory_limit=1024):
 
-                    if edges.empty:
-                        edges = self.__buildEdges(nodes, scoreBlocks_column, pvalBlocks_column, index_block,
-                                                  column_block, filter_type, hard_threshold, sign)
-                    else:
-                        dat_edges = self.__buildEdges(nodes, scoreBlocks_column, pvalBlocks_column, index_block,
-                                                      column_block, filter_type, hard_threshold, sign)
-                        edges = pd.concat([edges, dat_edges], sort=False).reset_index(drop=True)
-                else:
+        df_data, correlationType, n_bootstraps, memory_limit = self.__stabilityCheck(df_data, correlationType, n_bootstraps, memory_limit)
 
-                    if index_block != column_block:
+        edges = self.getEdges()
+        columns = pd.Index(df_data.columns)
 
-                        nodes, scoreBlocks_column, pvalBlocks_column = self.__scoreBlockColumn(nodes, peaktable,
-                                                                                               scoreBlocks_index,
-                                                                                               pvalBlocks_index,
-                                                                                               column_blocks,
-                                                                                               column_block);
-
-                        if edges.empty:
-                            edges = self.__buildEdges(nodes, scoreBlocks_column, pvalBlocks_column, index_block,
-                                                      column_block, filter_type, hard_threshold, sign)
-                        else:
-                            dat_edges = self.__buildEdges(nodes, scoreBlocks_column, pvalBlocks_column, index_block,
-                                                          column_block, filter_type, hard_threshold, sign)
-                            edges = pd.concat([edges, dat_edges], sort=False).reset_index(drop=True)
-                    else:
-                        if ((len(index_blocks) == 1) and (len(column_blocks) == 1)):
-                            if ((index_blocks[0] == '#no_multiple_blocks') and (
-                                    column_blocks[0] == '#no_multiple_blocks')):
-                                edges = self.__buildEdges(nodes, scoreBlocks_index, pvalBlocks_index, index_block,
-                                                          column_block, filter_type, hard_threshold, sign)
+        rows = columns.get_indexer(edges['start_name'].values) if not edges.empty else np.empty(0, dtype=int)
+        cols = columns.get_indexer(edges['end_name'].values) if not edges.empty else np.empty(0, dtype=int)
+
+        if (rows < 0).any() or (cols < 0).any():
+            print("Error: The df_data columns do not contain every node of the edges. Please check your data.")
+            sys.exit()
+
+        score_thresholds, pvalue_thresholds = self.__edgeThresholds(edges)
+
+        X = df_data.values.astype(float)
+
+        # Every resample is drawn up front, so the frequencies do not depend on how the resamples are split across threads
+        counts = np.random.default_rng(seed).multinomial(X.shape[0], np.full(X.shape[0], 1. / X.shape[0]), size=n_bootstraps)
+
+        chunk = max(1, min(-(-n_bootstraps // self.__n_jobs), int(memory_limit * 2 ** 20 / (8 * 4 * max(len(rows), 1)))))
+        chunks = [counts[x:x + chunk] for x in range(0, n_bootstraps, chunk)]
 
-        self.__setNodes(nodes)
-        self.__setEdges(edges)
+        def selected(resamples):
+
+            r, n = _bootstrapPairs(X, rows, cols, resamples, correlationType, memory_limit / self.__n_jobs)
+
+            keep = self.__signMask(r.ravel()).reshape(r.shape)
+
+            with np.errstate(invalid='ignore'):
+                keep &= np.isnan(score_thresholds) | (np.abs(r) > score_thresholds)
+                keep &= np.isnan(pvalue_thresholds) | (_pvalues(r, n) < pvalue_thresholds)
+
+            return keep.sum(axis=0)
+
+        # The resamples are independent, so their chunks run on a pool of threads (NumPy releases the GIL)
+        if self.__n_jobs == 1 or len(chunks) < 2:
+            frequency = sum(selected(x) for x in chunks)
+        else:
+            with ThreadPoolExecutor(max_workers=self.__n_jobs) as executor:
+                frequency = sum(executor.map(selected, chunks))
+
+        self.__stability = np.asarray(frequency, dtype=float) / n_bootstraps
+
+        self.__setEdges(None)
+
+        return self.getEdges()
 
     def getNodes(self):
 
@@ -145,9 +266,59 @@ class Edge:
 
     def getEdges(self):
 
+        if self.__edges is None:
+            self.__setEdges(self.__wideEdges())
+
         return self.__edges
 
-    def __checkData(self, df):
+    def getCompactEdges(self):
+
+        if self.__selection is None:
+            return pd.DataFrame()
+
+        selection, nearest = self.__selection
+
+        score, start_indexes, end_indexes, pvalue, qvalue = self.__selectionArrays(selection)
+
+        edges = pd.DataFrame({'start_index': start_indexes.astype(np.int32), 'end_index': end_indexes.astype(np.int32)})
+
+        if len(selection) > 0 and 'start_block' in selection[0][0]['columns']:
+            blocks = pd.unique(self.__index['nodes']['Block'])
+            lengths = [len(positions) for _, positions, _ in selection]
+
+            edges['start_block'] = pd.Categorical(np.repeat([x['start_block'] for x, _, _ in selection], lengths), categories=blocks)
+            edges['end_block'] = pd.Categorical(np.repeat([x['end_block'] for x, _, _ in selection], lengths), categories=blocks)
+
+        edges['score'] = score.astype(np.float32)
+        edges['sign'] = np.nan_to_num(np.sign(score)).astype(np.int8)
+
+        if pvalue is not None:
+            edges['pvalue'] = pvalue.astype(np.float32)
+
+        if qvalue is not None and self.__qvalueNeeded():
+            edges['qvalue'] = qvalue.astype(np.float32)
+
+        if nearest is not None:
+            edges = edges[nearest].reset_index(drop=True)
+
+        if self.__stability is not None:
+            edges['stability'] = self.__stability.astype(np.float32)
+
+        return edges
+
+    def __checkData(self, df, names=None):
+
+        # A condensed upper triangle from corrAnalysis is expanded to its (cached) dataframe matrix
+        if isinstance(df, condensedMatrix):
+            df = df.getDataFrame()
+
+        # Numpy arrays, including memory-mapped results from corrAnalysis, are wrapped without copying
+        if isinstance(df, np.ndarray) and names is not None:
+            if df.shape != (len(names), len(names)):
+                print("Error: The numpy matrix does not match the number of peaks in the Peak Table. Please check your data.")
+                sys.exit()
+
+            df = pd.DataFrame(df, index=list(names), columns=list(names), copy=False)
 
         if not isinstance(df, pd.DataFrame):
             print("Error: A dataframe was not entered. Please check your data.")
@@ -187,83 +358,170 @@ class Edge:
     def __checkDataIntersect(self, peaktable, datatable, pvalues):
         # Checks the datatable and peaktable contain the same number and order of nodes. If not, then the intersect is taken and the order based on the node (peak) list.
 
-        data_node_list = list(list(datatable.columns) + list(set(list(datatable.index)) - set(list(datatable.columns))))
-        peak_node_list = list(peaktable.Name)
+        # Names are matched through hash indexes, and the matrices reordered by taking positions
+        peak_names = pd.Index(peaktable['Name'])
+        row_names = pd.Index(datatable.index)
+        column_names = pd.Index(datatable.columns)
+
+        data_names = column_names.append(row_names[~row_names.isin(column_names)])
+        common = peak_names.isin(data_names)
 
-        columns_set = frozenset(list(datatable.columns))
-        index_set = frozenset(list(datatable.index))
+        if not common.any():
+            print("Error: The PeakTable Name list and DataTable row/column list do not have any common values!")
+            sys.exit()
 
-        if sorted(peak_node_list) == sorted(data_node_list):
+        if len(peak_names) > len(data_names) and not common.all():
+            peaktable = peaktable[common].drop(columns='Idx').reset_index(drop=True)
 
-            column_names = [x for x in peak_node_list if x in columns_set]
-            index_names = [x for x in peak_node_list if x in index_set]
+            peaktable.index.name = 'Idx'
 
-            tmp_data = datatable[column_names]
-            datatable = tmp_data.reindex(index_names)
+            peaktable = peaktable.reset_index()
 
-            if pvalues is not None:
-                tmp_pvalues = pvalues[column_names]
-                pvalues = tmp_pvalues.reindex(index_names)
-        else:
-            if len(peak_node_list) > len(data_node_list):
+            peak_names = pd.Index(peaktable['Name'])
+
+        index_names = peak_names[peak_names.isin(row_names)]
+        column_names = peak_names[peak_names.isin(column_names)]
 
-                check_intersect = set(peak_node_list).intersection(data_node_list)
+        datatable = self.__takeNames(datatable, index_names, column_names)
 
-                if check_intersect:
-                    sliced_peaks = peaktable[peaktable.Name.isin(data_node_list)]
+        if pvalues is not None:
+            pvalues = self.__takeNames(pvalues, index_names, column_names)
 
-                    sliced_peaks_node_list = list(sliced_peaks.Name)
+        return peaktable, datatable, pvalues
 
-                    column_names = [x for x in sliced_peaks_node_list if x in columns_set]
-                    index_names = [x for x in sliced_peaks_node_list if x in index_set]
+    def __takeNames(self, df, index_names, column_names):
 
-                    tmp_data = datatable[column_names]
-                    datatable = tmp_data.reindex(index_names)
+        rows = pd.Index(df.index).get_indexer(index_names)
+        columns = pd.Index(df.columns).get_indexer(column_names)
 
-                    if pvalues is not None:
-                        tmp_pvalues = pvalues[column_names]
-                        pvalues = tmp_pvalues.reindex(index_names)
+        # Only reorder (and so copy) the matrix when it is not already in peak order
+        if len(rows) == len(df.index) and len(columns) == len(df.columns) and (np.diff(rows) > 0).all() and (np.diff(columns) > 0).all():
+            return df
 
-                    peaktable.drop('Idx', 1, inplace=True)
+        return df.iloc[rows, columns]
 
-                    peaktable = peaktable.reset_index(drop=True)
+    def __namePositions(self, peaktable, datatable):
 
-                    peaktable.index.name = 'Idx'
+        # The position of every peak in the rows and columns of the matrix (-1 when it is not there), found once and
+        # reused by every block
+        peak_names = pd.Index(peaktable['Name'])
+        row_names = pd.Index(datatable.index)
+        column_names = pd.Index(datatable.columns)
 
-                    peaktable = peaktable.reset_index()
-                else:
-                    print("Error: The PeakTable Name list and DataTable row/column list do not have any common values!")
-                    sys.exit()
+        return {'rows': row_names.get_indexer(peak_names), 'columns': column_names.get_indexer(peak_names),
+                'symmetric': len(row_names) == len(column_names) and row_names.isin(column_names).all()}
+
+    def __isMatrix(self, df):
+
+        return isinstance(df, (condensedMatrix, np.ndarray)) or scipy.sparse.issparse(df)
+
+    def __checkMatrix(self, peaktable, datatable, pvalues, names):
+
+        if isinstance(datatable, condensedMatrix):
+            kind = 'condensed'
+            size = len(datatable.getNames())
+
+            if names is None:
+                names = datatable.getNames()
+        else:
+            kind = 'sparse' if scipy.sparse.issparse(datatable) else 'dense'
+            size = datatable.shape[0] if datatable.ndim == 2 and datatable.shape[0] == datatable.shape[1] else -1
+
+            if names is None:
+                names = peaktable['Name']
+
+        names = pd.Index(list(names))
+
+        if len(names) != size:
+            print("Error: The matrix is not square or does not match the number of names. Please check your data.")
+            sys.exit()
+
+        if not names.is_unique:
+            print("Error: The matrix names are not unique. Please check your data.")
+            sys.exit()
+
+        if pvalues is not None:
+            if kind == 'condensed':
+                valid = isinstance(pvalues, condensedMatrix) and list(pvalues.getNames()) == list(datatable.getNames())
+            elif kind == 'sparse':
+                valid = (isinstance(pvalues, np.ndarray) or scipy.sparse.issparse(pvalues)) and pvalues.shape == datatable.shape
             else:
-                check_intersect = set(data_node_list).intersection(peak_node_list)
+                valid = isinstance(pvalues, np.ndarray) and pvalues.shape == datatable.shape
 
-                if check_intersect:
-                    column_names = [x for x in peak_node_list if x in columns_set]
-                    index_names = [x for x in peak_node_list if x in index_set]
+            if not valid:
+                print("Error: The pvalues matrix does not match the datatable matrix. Please check your data.")
+                sys.exit()
 
-                    tmp_data = datatable[column_names]
-                    tmp_data = tmp_data[tmp_data.index.isin(index_names)]
-                    datatable = tmp_data.reindex(index_names)
+        if kind == 'condensed':
+            score = datatable.getCondensed()
+            pvalue = pvalues.getCondensed() if pvalues is not None else None
+        elif kind == 'sparse':
+            score = self.__canonicalSparse(datatable)
+            pvalue = pvalues
 
-                    if pvalues is not None:
-                        tmp_pvalues = pvalues[column_names]
-                        tmp_pvalues = tmp_pvalues[tmp_pvalues.index.isin(index_names)]
-                        pvalues = tmp_pvalues.reindex(index_names)
-                else:
-                    print("Error: The PeakTable Name list and DataTable row/column list do not have any common values!")
+            # Sparse pvalues are kept as the values stored alongside each score, so both must store the same pairs
+            if scipy.sparse.issparse(pvalues):
+                pvalues = self.__canonicalSparse(pvalues)
+
+                if not (np.array_equal(pvalues.indptr, score.indptr) and np.array_equal(pvalues.indices, score.indices)):
+                    print("Error: The sparse pvalues matrix does not store the same pairs as the datatable. Please check your data.")
                     sys.exit()
 
-        return peaktable, datatable, pvalues
+                pvalue = pvalues.data
+        else:
+            score = datatable
+            pvalue = pvalues
+
+        positions = names.get_indexer(peaktable['Name'])
+
+        if not (positions >= 0).any():
+            print("Error: The PeakTable Name list and DataTable row/column list do not have any common values!")
+            sys.exit()
+
+        # Peaks missing from the matrix are dropped and the remaining peaks reindexed, as for a dataframe matrix
+        if not (positions >= 0).all():
+            peaktable = peaktable[positions >= 0].drop(columns='Idx').reset_index(drop=True)
+
+            peaktable.index.name = 'Idx'
+
+            peaktable = peaktable.reset_index()
+
+        return peaktable, {'kind': kind, 'names': names, 'score': score, 'pvalue': pvalue}
+
+    def __canonicalSparse(self, matrix):
+
+        matrix = matrix.tocsr()
+
+        if not matrix.has_canonical_format:
+            matrix = matrix.copy()
+            matrix.sum_duplicates()
+
+        return matrix
+
+    def __paramCheck(self, filter_type, hard_threshold, withinBlocks, sign, block_thresholds):
+
+        if filter_type.lower() not in ["pvalue", "score", "qvalue"]:
+            print("Error: Filter type not valid. Choose either \"Pvalue\", \"Qvalue\" or \"Score\".")
+            sys.exit()
+
+        if filter_type.lower() == "qvalue" and self.__pvalues is None:
+            print("Error: A qvalue filter needs pvalues. Please check your data.")
+            sys.exit()
+
+        hard_threshold = self.__thresholdCheck(hard_threshold)
 
-    def __paramCheck(self, filter_type, hard_threshold, withinBlocks, sign):
+        if block_thresholds is None:
+            block_thresholds = {}
 
-        if filter_type.lower() not in ["pvalue", "score"]:
-            print("Error: Filter type not valid. Choose either \"Pvalue\" or \"Score\".")
+        if not isinstance(block_thresholds, dict) or not all(isinstance(x, tuple) and len(x) == 2 for x in block_thresholds):
+            print("Error: Block thresholds are not valid. Choose a dictionary keyed by (block, block) tuples.")
             sys.exit()
 
-        if not isinstance(hard_threshold, float):
-            if not isinstance(hard_threshold, int):
-                print("Error: Hard threshold is not valid. Choose a float or integer value.")
+        block_thresholds = {blocks: self.__thresholdCheck(value) for blocks, value in block_thresholds.items()}
+
+        if self.__pvalues is None:
+            if any(isinstance(x, dict) and ('pvalue' in x or 'qvalue' in x) for x in [hard_threshold] + list(block_thresholds.values())):
+                print("Error: A pvalue or qvalue threshold was given without any pvalues. Please check your parameters.")
                 sys.exit()
 
         if not type(withinBlocks) == bool:
@@ -274,35 +532,146 @@ class Edge:
             print("Error: Sign is not valid. Choose either \"pos\" or \"neg\" or \"both\".")
             sys.exit()
 
-        return filter_type, hard_threshold, withinBlocks, sign
+        return filter_type, hard_threshold, withinBlocks, sign, block_thresholds
+
+    def __writeCheck(self, path, file_format, memory_limit):
 
-    def __scoreBlockIndex(self, nodes, peaks, data, pvalues, blocks, index_block):
+        if not isinstance(path, str):
+            print("Error: The path is not valid. Choose a file path.")
+            sys.exit()
 
-        node_data = []
+        if file_format is None:
+            file_format = "parquet" if path.lower().endswith(".parquet") else "csv"
 
-        if blocks[0] != '#no_multiple_blocks':
-            for col in peaks.columns:
-                node_data.append(list(peaks[peaks['Block'] == index_block][col].values))
+        if file_format.lower() not in ["csv", "parquet"]:
+            print("Error: File format not valid. Choose either \"csv\" or \"parquet\".")
+            sys.exit()
+
+        if file_format.lower() == "parquet":
+            try:
+                import pyarrow
+            except ImportError:
+                print("Error: Writing Parquet files needs pyarrow. Please install pyarrow or choose \"csv\".")
+                sys.exit()
+
+        if not isinstance(memory_limit, (int, float)) or memory_limit <= 0:
+            print("Error: memory_limit is not valid. Choose a positive number of megabytes.")
+            sys.exit()
+
+        if self.__k_nearest is not None:
+            print("Error: k_nearest needs every edge of a node at once and cannot be streamed. Use build instead.")
+            sys.exit()
+
+        if self.__qvalueNeeded():
+            print("Error: qvalues need every pvalue of the network at once and cannot be streamed. Use build instead.")
+            sys.exit()
+
+        return file_format.lower(), memory_limit
 
-            index_block_names = list(peaks[peaks['Block'] == index_block]['Name'].values)
+    def __stabilityCheck(self, df_data, correlationType, n_bootstraps, memory_limit):
+
+        if not isinstance(df_data, pd.DataFrame):
+            print("Error: A dataframe was not entered. Please check your data.")
+            sys.exit()
+
+        if correlationType.lower() not in ["pearson", "spearman"]:
+            print("Error: Correlation type not valid. Choose either \"Pearson\" or \"Spearman\".")
+            sys.exit()
+
+        if not isinstance(n_bootstraps, int) or n_bootstraps < 1:
+            print("Error: n_bootstraps is not valid. Choose a positive integer.")
+            sys.exit()
+
+        if not isinstance(memory_limit, (int, float)) or memory_limit <= 0:
+            print("Error: memory_limit is not valid. Choose a positive number of megabytes.")
+            sys.exit()
+
+        if self.__selection is None:
+            print("Error: The edges have not been built. Run build first.")
+            sys.exit()
+
+        if self.__qvalueNeeded():
+            print("Error: qvalues need every pvalue of the network and cannot be resampled edge by edge. Filter on pvalues or scores instead.")
+            sys.exit()
+
+        return df_data, correlationType.lower(), n_bootstraps, memory_limit
+
+    def __edgeThresholds(self, edges):
+
+        score_thresholds = np.full(len(edges), np.nan)
+        pvalue_thresholds = np.full(len(edges), np.nan)
+
+        if 'start_block' in edges.columns:
+            groups = edges.groupby(['start_block', 'end_block'], sort=False).indices
         else:
-            for col in peaks.columns:
-                node_data.append(list(peaks[col].values))
+            groups = {('#no_multiple_blocks', '#no_multiple_blocks'): np.arange(len(edges))}
 
-            index_block_names = list(peaks['Name'].values)
+        # Each edge is held to the thresholds of its pair of blocks
+        for (start_block, end_block), positions in groups.items():
+            thresholds = self.__thresholds(start_block, end_block, self.__pvalues is not None)
 
-        if blocks[0] == '#no_multiple_blocks':
-            scoreBlocks_index = data
+            score_thresholds[positions] = thresholds.get('score', np.nan)
+            pvalue_thresholds[positions] = thresholds.get('pvalue', np.nan)
+
+        return score_thresholds, pvalue_thresholds
+
+    def __nearestCheck(self, k_nearest, mutual):
+
+        if k_nearest is not None:
+            if not isinstance(k_nearest, int) or k_nearest < 1:
+                print("Error: k_nearest is not valid. Choose a positive integer or None.")
+                sys.exit()
+
+        if not type(mutual) == bool:
+            print("Error: mutual is not valid. Choose either \"True\" or \"False\".")
+            sys.exit()
+
+        return k_nearest, mutual
+
+    def __thresholdCheck(self, hard_threshold):
+
+        if isinstance(hard_threshold, dict):
+            hard_threshold = {key.lower(): value for key, value in hard_threshold.items()}
+
+            if len(hard_threshold) == 0 or not set(hard_threshold).issubset(["pvalue", "qvalue", "score"]):
+                print("Error: Hard threshold is not valid. Choose a dictionary keyed by \"pvalue\", \"qvalue\" and/or \"score\".")
+                sys.exit()
+
+            thresholds = list(hard_threshold.values())
         else:
-            scoreBlocks_index = data[data.index.isin(index_block_names)]
+            thresholds = [hard_threshold]
 
-        if pvalues is not None:
-            if blocks[0] == '#no_multiple_blocks':
-                pvalBlocks_index = pvalues
-            else:
-                pvalBlocks_index = pvalues[pvalues.index.isin(index_block_names)]
+        if not all(isinstance(x, (int, float)) for x in thresholds):
+            print("Error: Hard threshold is not valid. Choose a float or integer value.")
+            sys.exit()
+
+        return hard_threshold
+
+    def __blockPeaks(self, peaks, block):
+
+        # The peaks of each block are sliced once and reused by every block pair
+        if self.__block_peaks is None:
+            self.__block_peaks = {x: peaks[peaks['Block'] == x] for x in peaks['Block'].unique()}
+
+        return self.__block_peaks[block]
+
+    def __blockPositions(self, block_peaks, axis):
+
+        positions = self.__positions[axis][block_peaks['Idx'].values]
+
+        return positions[positions >= 0]
+
+    def __scoreBlockIndex(self, nodes, peaks, data, blocks, index_block):
+
+        block_peaks = self.__blockPeaks(peaks, index_block) if blocks[0] != '#no_multiple_blocks' else peaks
+
+        node_data = [list(block_peaks[col].values) for col in peaks.columns]
+
+        # Only the positions of the block are kept here, and the block is sliced from the matrix when it is indexed
+        if blocks[0] == '#no_multiple_blocks':
+            index_block_rows = None
         else:
-            pvalBlocks_index = None;
+            index_block_rows = self.__blockPositions(block_peaks, 'rows')
 
         if nodes.empty:
             nodes = pd.DataFrame(np.column_stack(node_data), columns=peaks.columns)
@@ -319,30 +688,17 @@ class Edge:
         if blocks[0] == '#no_multiple_blocks':
             nodes = nodes.drop(columns="Block")
 
-        return nodes, scoreBlocks_index, pvalBlocks_index
-
-    def __scoreBlockColumn(self, nodes, peaks, data, pvalues, blocks, column_block):
+        return nodes, index_block_rows
 
-        node_data = []
-
-        if blocks[0] != '#no_multiple_blocks':
-
-            for col in peaks.columns:
-                node_data.append(list(peaks[peaks['Block'] == column_block][col].values))
-
-            column_block_names = list(peaks[peaks['Block'] == column_block]['Name'].values)
-        else:
-            for col in peaks.columns:
-                node_data.append(list(peaks[col].values))
+    def __scoreBlockColumn(self, nodes, peaks, data, blocks, column_block):
 
-            column_block_names = list(peaks['Name'].values)
+        block_peaks = self.__blockPeaks(peaks, column_block) if blocks[0] != '#no_multiple_blocks' else peaks
 
-        scoreBlocks_column = data[column_block_names].astype(float)
+        node_data = [list(block_peaks[col].values) for col in peaks.columns]
+        column_block_columns = self.__blockPositions(block_peaks, 'columns')
 
-        if pvalues is not None:
-            pvalBlocks_column = pvalues[column_block_names].astype(float)
-        else:
-            pvalBlocks_column = None;
+        if len(column_block_columns) == data.shape[1]:
+            column_block_columns = None
 
         if nodes.empty:
             nodes = pd.DataFrame(np.column_stack(node_data), columns=peaks.columns)
@@ -356,9 +712,135 @@ class Edge:
 
                 nodes = pd.concat([nodes, dat], sort=False).reset_index(drop=True)
 
-        return nodes, scoreBlocks_column, pvalBlocks_column
+        return nodes, column_block_columns
+
+    def __blockSlice(self, rows, columns):
+
+        # rows or columns of None take the whole axis, so a matrix already in float is not copied
+        blocks = []
+
+        for data in [self.__datatable, self.__pvalues]:
+            if data is None:
+                blocks.append(None)
+            elif rows is None and columns is None:
+                blocks.append(data.astype(float, copy=False))
+            else:
+                blocks.append(data.iloc[slice(None) if rows is None else rows,
+                                        slice(None) if columns is None else columns].astype(float, copy=False))
+
+        return blocks[0], blocks[1]
+
+    def __buildIndex(self, sweep=None):
+
+        # The sweep bounds of the current index are kept, so that an index is only ever widened
+        previous = {}
+
+        if self.__index is not None and self.__index['withinBlocks'] == self.__withinBlocks:
+            previous = {(x['start_block'], x['end_block']): (x['key'], x['bound']) for x in self.__index['segments']}
+
+        if self.__matrix is not None:
+            nodes, segments = self.__matrixIndex(previous, sweep)
+
+            self.__index = {'withinBlocks': self.__withinBlocks, 'nodes': nodes, 'segments': segments,
+                            'qvalue_scope': self.__qvalue_scope if self.__qvalueNeeded(sweep) else None}
+
+            return
+
+        peaktable = self.__peaktable
+        datatable = self.__datatable
+
+        nodes = pd.DataFrame();
+        jobs = [];
+
+        if 'Block' in peaktable.columns:
+            index_blocks = peaktable[self.__positions['rows'] >= 0].Block.unique()
+            column_blocks = peaktable[self.__positions['columns'] >= 0].Block.unique()
+        else:
+            index_blocks = ['#no_multiple_blocks']
+            column_blocks = ['#no_multiple_blocks']
+
+        for idx, index_block in enumerate(index_blocks):
+
+            nodes, index_block_rows = self.__scoreBlockIndex(nodes, peaktable, datatable, index_blocks, index_block)
+
+            if self.__positions['symmetric']:
+                iter_idx = idx;
+            else:
+                iter_idx = 0;
+
+            for column_block in column_blocks[iter_idx:]:
+
+                if self.__withinBlocks:
+
+                    nodes, column_block_columns = self.__scoreBlockColumn(nodes, peaktable, datatable, column_blocks, column_block);
+
+                    jobs.append((nodes, index_block_rows, column_block_columns, index_block, column_block))
+                else:
+
+                    if index_block != column_block:
+
+                        nodes, column_block_columns = self.__scoreBlockColumn(nodes, peaktable, datatable, column_blocks, column_block);
+
+                        jobs.append((nodes, index_block_rows, column_block_columns, index_block, column_block))
+                    else:
+                        if ((len(index_blocks) == 1) and (len(column_blocks) == 1)):
+                            if ((index_blocks[0] == '#no_multiple_blocks') and (
+                                    column_blocks[0] == '#no_multiple_blocks')):
+                                jobs.append((nodes, index_block_rows, None, index_block, column_block))
+
+        # The block pairs are independent, so they are sliced and indexed on a pool of threads (NumPy releases the GIL)
+        # and collected in the order of the loop. Each block pair is only sliced by its own task, so no more blocks are
+        # held at once than there are threads
+        qvalues = None
+
+        # q-values need the pvalues of every tested pair of their family before any segment can be indexed
+        if self.__qvalueNeeded(sweep):
+            qvalues = self.__qvalueTables([(job[3], job[4]) for job in jobs], [self.__testedPvalues(*job) for job in jobs])
+
+        if self.__n_jobs == 1 or len(jobs) < 2:
+            segments = [self.__indexSegment(*job, previous, sweep, qvalues) for job in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=self.__n_jobs) as executor:
+                segments = list(executor.map(lambda job: self.__indexSegment(*job, previous, sweep, qvalues), jobs))
+
+        self.__index = {'withinBlocks': self.__withinBlocks, 'nodes': nodes, 'segments': segments,
+                        'qvalue_scope': self.__qvalue_scope if qvalues is not None else None}
+
+    def __indexSegment(self, nodes, rows, columns, start_block, end_block, previous, sweep, qvalues):
 
-    def __buildEdges(self, nodes, SCORE, PVAL, start_block, end_block, filter_type, hard_threshold, sign):
+        SCORE, PVAL = self.__blockSlice(rows, columns)
+
+        start_block_nodes, end_block_nodes, multiple_blocks, symmetric = self.__segmentNodes(nodes, SCORE, start_block, end_block)
+
+        columns = self.__edgeColumns(multiple_blocks, PVAL is not None)
+
+        # The segment keeps every pair passing the loosest threshold asked of it so far, sorted on that threshold's value
+        key, bound = self.__segmentBound(start_block, end_block, PVAL is not None, previous, sweep)
+
+        QVAL = self.__qvalueLookup(qvalues[(start_block, end_block)], PVAL.values) if qvalues is not None else None
+
+        with np.errstate(invalid='ignore'):
+            if key == "score":
+                keep = self.__sweepValue(key, np.abs(SCORE.values)) < bound
+            elif key == "qvalue":
+                keep = QVAL < bound
+            else:
+                keep = PVAL.values < bound
+
+        start_indexes = start_block_nodes.index.values
+        end_indexes = end_block_nodes.index.values
+
+        rows, cols = np.nonzero(keep & self.__testedPairs(start_indexes, end_indexes, symmetric))
+
+        score = SCORE.values[rows, cols]
+        pvalue = PVAL.values[rows, cols] if PVAL is not None else None
+        qvalue = QVAL[rows, cols] if QVAL is not None else None
+
+        return self.__segment(start_block, end_block, columns, key, bound, rows, cols, score, pvalue,
+                              (start_indexes, SCORE.index.values, start_block_nodes['Label'].values),
+                              (end_indexes, SCORE.columns.values, end_block_nodes['Label'].values), qvalue)
+
+    def __segmentNodes(self, nodes, SCORE, start_block, end_block):
 
         if 'Block' in nodes.columns:
             blocks = list(nodes['Block'].unique())
@@ -372,214 +854,698 @@ class Edge:
             start_block_nodes = nodes
             end_block_nodes = nodes
 
-        def __score(start_block_nodes, end_block_nodes, SCORE, PVAL, start_block, end_block, blocks, hard_threshold):
+        # A symmetric matrix only contributes its upper triangle. Otherwise the block nodes are narrowed to the rows and
+        # columns of the matrix.
+        symmetric = len(SCORE.index) == len(SCORE.columns) and SCORE.index.isin(SCORE.columns).all()
 
-            score_cols = SCORE.columns
-            score_rows = SCORE.index
+        if not symmetric:
+            start_block_nodes = start_block_nodes[self.__nodeMask(blocks, start_block, 'rows')]
+            end_block_nodes = end_block_nodes[self.__nodeMask(blocks, end_block, 'columns')]
 
-            start_block_indexes = list(start_block_nodes.index)
-            end_block_indexes = list(end_block_nodes.index)
+        return start_block_nodes, end_block_nodes, blocks[0] != '#no_multiple_blocks', symmetric
 
-            start_block_names = list(start_block_nodes['Name'])
-            end_block_names = list(end_block_nodes['Name'])
+    def __testedPairs(self, start_indexes, end_indexes, symmetric):
 
-            start_block_labels = list(start_block_nodes['Label'])
-            end_block_labels = list(end_block_nodes['Label'])
+        # Self-loops are dropped
+        tested = start_indexes[:, None] != end_indexes[None, :]
 
-            e = []
+        return np.triu(tested) if symmetric else tested
 
-            for i_idx in range(0, len(score_rows)):
+    def __testedPvalues(self, nodes, rows, columns, start_block, end_block):
 
-                start_name = score_rows[i_idx]
+        SCORE, PVAL = self.__blockSlice(rows, columns)
 
-                if set(list(SCORE.columns)) == set(list(SCORE.index)):
-                    col_idx = i_idx
-                else:
-                    col_idx = 0;
-                    columns_set = frozenset(list(SCORE.columns))
-                    index_set = frozenset(list(SCORE.index))
+        start_block_nodes, end_block_nodes, _, symmetric = self.__segmentNodes(nodes, SCORE, start_block, end_block)
 
-                    start_block_names = [x for x in start_block_names if x in index_set]
-                    end_block_names = [x for x in end_block_names if x in columns_set]
+        return PVAL.values[self.__testedPairs(start_block_nodes.index.values, end_block_nodes.index.values, symmetric)]
 
-                    start_block_labels = list(
-                        start_block_nodes[start_block_nodes['Name'].isin(start_block_names)]['Label'])
-                    end_block_labels = list(end_block_nodes[end_block_nodes['Name'].isin(end_block_names)]['Label'])
+    def __qvalueTables(self, pairs, pvalues):
 
-                    start_block_indexes = list(
-                        start_block_nodes[start_block_nodes['Name'].isin(start_block_names)].index)
-                    end_block_indexes = list(end_block_nodes[end_block_nodes['Name'].isin(end_block_names)].index)
+        # Benjamini-Hochberg q-values, over every tested pair at once or over the pairs of each block pair
+        if self.__qvalue_scope == "global":
+            table = self.__qvalueTable(np.concatenate(pvalues) if len(pvalues) > 0 else np.empty(0))
 
-                for j_idx in range(col_idx, len(score_cols)):
+            return {pair: table for pair in pairs}
 
-                    if (abs(SCORE.values[i_idx, j_idx]) > hard_threshold):
+        return {pair: self.__qvalueTable(x) for pair, x in zip(pairs, pvalues)}
 
-                        end_name = score_cols[j_idx]
+    def __qvalueTable(self, pvalues):
 
-                        start_label = start_block_labels[i_idx]
-                        end_label = end_block_labels[j_idx]
+        pvalues = np.sort(pvalues[~np.isnan(pvalues)])
 
-                        start_index = start_block_indexes[i_idx]
-                        end_index = end_block_indexes[j_idx]
+        qvalues = pvalues * len(pvalues) / np.arange(1, len(pvalues) + 1)
+        qvalues = np.minimum(np.minimum.accumulate(qvalues[::-1])[::-1], 1)
 
-                        if start_index != end_index:
-                            if PVAL is None:
+        return pvalues, qvalues
 
-                                if blocks[0] != '#no_multiple_blocks':
-                                    b = [start_index, start_name, start_label, start_block, end_index, end_name,
-                                         end_label, end_block, SCORE.values[i_idx, j_idx],
-                                         np.sign(SCORE.values[i_idx, j_idx])];
-                                else:
-                                    b = [start_index, start_name, start_label, end_index, end_name, end_label,
-                                         SCORE.values[i_idx, j_idx], np.sign(SCORE.values[i_idx, j_idx])];
-                            else:
+    def __qvalueLookup(self, table, pvalues):
 
-                                if blocks[0] != '#no_multiple_blocks':
-                                    b = [start_index, start_name, start_label, start_block, end_index, end_name,
-                                         end_label, end_block, SCORE.values[i_idx, j_idx],
-                                         np.sign(SCORE.values[i_idx, j_idx]), PVAL.values[i_idx, j_idx]];
-                                else:
-                                    b = [start_index, start_name, start_label, end_index, end_name, end_label,
-                                         SCORE.values[i_idx, j_idx], np.sign(SCORE.values[i_idx, j_idx]),
-                                         PVAL.values[i_idx, j_idx]];
-                            e.append(b)
+        sorted_pvalues, qvalues = table
 
-            if PVAL is None:
+        if len(qvalues) == 0:
+            return np.full(np.shape(pvalues), np.nan)
 
-                if blocks[0] != '#no_multiple_blocks':
-                    score = pd.DataFrame(e, columns=['start_index', 'start_name', 'start_label', 'start_block',
-                                                     'end_index', 'end_name', 'end_label', 'end_block', 'score',
-                                                     'sign'])
-                else:
-                    score = pd.DataFrame(e,
-                                         columns=['start_index', 'start_name', 'start_label', 'end_index', 'end_name',
-                                                  'end_label', 'score', 'sign'])
-            else:
+        # The q-values rise with the pvalues, so each pvalue takes the q-value of its place in the sorted family
+        positions = np.minimum(np.searchsorted(sorted_pvalues, pvalues), len(qvalues) - 1)
 
-                if blocks[0] != '#no_multiple_blocks':
-                    score = pd.DataFrame(e, columns=['start_index', 'start_name', 'start_label', 'start_block',
-                                                     'end_index', 'end_name', 'end_label', 'end_block', 'score', 'sign',
-                                                     'pvalue'])
-                else:
-                    score = pd.DataFrame(e,
-                                         columns=['start_index', 'start_name', 'start_label', 'end_index', 'end_name',
-                                                  'end_label', 'score', 'sign', 'pvalue'])
+        return np.where(np.isnan(pvalues), np.nan, qvalues[positions])
 
-            return score
+    def __qvalueNeeded(self, sweep=None):
 
-        def __pval(start_block_nodes, end_block_nodes, SCORE, PVAL, start_block, end_block, blocks, hard_threshold):
+        thresholds = [self.__hard_threshold] + list(self.__block_thresholds.values())
 
-            score_cols = SCORE.columns
-            score_rows = SCORE.index
+        if sweep is not None and sweep[0] == "qvalue":
+            return True
 
-            start_block_indexes = list(start_block_nodes.index)
-            end_block_indexes = list(end_block_nodes.index)
+        return self.__filter_type.lower() == "qvalue" or any(isinstance(x, dict) and 'qvalue' in x for x in thresholds)
 
-            start_block_names = list(start_block_nodes['Name'])
-            end_block_names = list(end_block_nodes['Name'])
+    def __nodeMask(self, blocks, block, axis):
 
-            start_block_labels = list(start_block_nodes['Label'])
-            end_block_labels = list(end_block_nodes['Label'])
+        peaks = self.__blockPeaks(self.__peaktable, block) if blocks[0] != '#no_multiple_blocks' else self.__peaktable
 
-            e = []
+        return self.__positions[axis][peaks['Idx'].values] >= 0
 
-            for i_idx in range(0, len(score_rows)):
+    def __segment(self, start_block, end_block, columns, key, bound, rows, cols, score, pvalue, start_nodes, end_nodes, qvalue=None):
 
-                start_name = score_rows[i_idx]
+        sweep_values = {'score': self.__sweepValue(key, np.abs(score)), 'pvalue': pvalue, 'qvalue': qvalue}[key]
+        order = np.argsort(sweep_values, kind='stable')
 
-                if set(list(SCORE.columns)) == set(list(SCORE.index)):
-                    col_idx = i_idx
-                else:
-                    col_idx = 0;
-                    columns_set = frozenset(list(SCORE.columns))
-                    index_set = frozenset(list(SCORE.index))
+        return {'start_block': start_block, 'end_block': end_block, 'columns': columns, 'key': key, 'bound': bound,
+                'rows': rows, 'cols': cols, 'score': score, 'pvalue': pvalue, 'qvalue': qvalue, 'order': order,
+                'sweep': sweep_values, 'sorted': sweep_values[order],
+                'start_indexes': start_nodes[0], 'start_names': start_nodes[1], 'start_labels': start_nodes[2],
+                'end_indexes': end_nodes[0], 'end_names': end_nodes[1], 'end_labels': end_nodes[2]}
 
-                    start_block_names = [x for x in start_block_names if x in index_set]
-                    end_block_names = [x for x in end_block_names if x in columns_set]
+    def __edgeColumns(self, multiple_blocks, pvalues_available):
 
-                    start_block_labels = list(
-                        start_block_nodes[start_block_nodes['Name'].isin(start_block_names)]['Label'])
-                    end_block_labels = list(end_block_nodes[end_block_nodes['Name'].isin(end_block_names)]['Label'])
+        columns = ['start_index', 'start_name', 'start_label', 'end_index', 'end_name', 'end_label', 'score', 'sign']
 
-                    start_block_indexes = list(
-                        start_block_nodes[start_block_nodes['Name'].isin(start_block_names)].index)
-                    end_block_indexes = list(end_block_nodes[end_block_nodes['Name'].isin(end_block_names)].index)
+        if multiple_blocks:
+            columns = columns[:3] + ['start_block'] + columns[3:6] + ['end_block'] + columns[6:]
 
-                for j_idx in range(col_idx, len(score_cols)):
+        if pvalues_available:
+            columns = columns + ['pvalue']
 
-                    end_name = score_cols[j_idx]
+        return columns
 
-                    start_label = start_block_labels[i_idx]
-                    end_label = end_block_labels[j_idx]
+    def __segmentBound(self, start_block, end_block, pvalues_available, previous, sweep):
 
-                    start_index = start_block_indexes[i_idx]
-                    end_index = end_block_indexes[j_idx]
+        key, bound = self.__primaryThreshold(start_block, end_block, pvalues_available) if sweep is None else sweep
 
-                    if start_index != end_index:
-                        if PVAL is None:
+        if previous.get((start_block, end_block), (None,))[0] == key:
+            bound = max(bound, previous[(start_block, end_block)][1])
 
-                            if blocks[0] != '#no_multiple_blocks':
-                                b = [start_index, start_name, start_label, start_block, end_index, end_name, end_label,
-                                     end_block, SCORE.values[i_idx, j_idx], np.sign(SCORE.values[i_idx, j_idx])];
-                            else:
-                                b = [start_index, start_name, start_label, end_index, end_name, end_label,
-                                     SCORE.values[i_idx, j_idx], np.sign(SCORE.values[i_idx, j_idx])];
+        return key, bound
 
-                            e.append(b)
-                        else:
-                            if (PVAL.values[i_idx, j_idx] < hard_threshold):
+    def __matrixNodes(self):
+
+        peaktable = self.__peaktable
 
-                                if blocks[0] != '#no_multiple_blocks':
-                                    b = [start_index, start_name, start_label, start_block, end_index, end_name,
-                                         end_label, end_block, SCORE.values[i_idx, j_idx],
-                                         np.sign(SCORE.values[i_idx, j_idx]), PVAL.values[i_idx, j_idx]]
-                                else:
-                                    b = [start_index, start_name, start_label, end_index, end_name, end_label,
-                                         SCORE.values[i_idx, j_idx], np.sign(SCORE.values[i_idx, j_idx]),
-                                         PVAL.values[i_idx, j_idx]];
+        if 'Block' in peaktable.columns:
+            blocks = list(peaktable.Block.unique())
+            block_peaks = [self.__blockPeaks(peaktable, block) for block in blocks]
+        else:
+            blocks = ['#no_multiple_blocks']
+            block_peaks = [peaktable]
 
-                                e.append(b)
+        # The nodes are laid out block by block, as they are for a dataframe matrix
+        nodes = []
 
-            if PVAL is None:
+        for block, peaks in zip(blocks, block_peaks):
+            dat = pd.DataFrame(np.column_stack([list(peaks[col].values) for col in peaktable.columns]), columns=peaktable.columns)
+            dat['Block'] = block
 
-                if blocks[0] != '#no_multiple_blocks':
-                    pval = pd.DataFrame(e,
-                                        columns=['start_index', 'start_name', 'start_label', 'start_block', 'end_index',
-                                                 'end_name', 'end_label', 'end_block', 'score', 'sign'])
-                else:
-                    pval = pd.DataFrame(e, columns=['start_index', 'start_name', 'start_label', 'end_index', 'end_name',
-                                                    'end_label', 'score', 'sign'])
+            nodes.append(dat)
+
+        nodes = pd.concat(nodes, sort=False).reset_index(drop=True)
+
+        if blocks[0] == '#no_multiple_blocks':
+            nodes = nodes.drop(columns="Block")
+
+        peaks = pd.concat(block_peaks)
+        ranks = np.repeat(np.arange(len(blocks)), [len(x) for x in block_peaks])
+
+        node_positions = np.full(len(self.__matrix['names']), -1)
+        node_positions[self.__matrix['names'].get_indexer(peaks['Name'])] = np.arange(len(peaks))
+
+        return nodes, blocks, peaks, ranks, node_positions
+
+    def __matrixEntries(self, node_positions, memory_limit=1024):
+
+        # Yields the stored pairs of the matrix as arrays of start nodes, end nodes, scores and pvalues, each pair once
+        # and with the start node before the end node
+        matrix = self.__matrix
+        score_matrix = matrix['score']
+        pvalue_matrix = matrix['pvalue']
+
+        size = len(node_positions)
+        chunk = max(1, int(memory_limit * 2 ** 20 / (8 * 6)))
+
+        if matrix['kind'] == 'sparse':
+            rows = np.repeat(np.arange(size), np.diff(score_matrix.indptr))
+            cols = score_matrix.indices
+
+            if pvalue_matrix is None:
+                pvalue = None
+            elif pvalue_matrix.ndim == 1:
+                pvalue = pvalue_matrix
             else:
+                pvalue = np.asarray(pvalue_matrix[rows, cols], dtype=float)
+
+            yield self.__matrixPairs(node_positions[rows], node_positions[cols], score_matrix.data.astype(float), pvalue, True)
+
+        elif matrix['kind'] == 'dense':
+            tile = max(1, chunk // max(size, 1))
+
+            for start in range(0, size, tile):
+                stop = min(start + tile, size)
+                start_nodes = node_positions[start:stop]
+
+                # Both triangles hold every pair, so each pair is read from the row of its start node
+                rows, cols = np.nonzero((start_nodes[:, None] >= 0) & (start_nodes[:, None] < node_positions[None, :]))
+
+                score = np.asarray(score_matrix[start:stop], dtype=float)[rows, cols]
+                pvalue = np.asarray(pvalue_matrix[start:stop], dtype=float)[rows, cols] if pvalue_matrix is not None else None
+
+                yield start_nodes[rows], node_positions[cols], score, pvalue
+
+        else:
+            # The condensed values run along the rows of the upper triangle
+            offsets = np.r_[0, np.cumsum(np.arange(size - 1, 0, -1))]
+
+            for start in range(0, len(score_matrix), chunk):
+                positions = np.arange(start, min(start + chunk, len(score_matrix)))
 
-                if blocks[0] != '#no_multiple_blocks':
-                    pval = pd.DataFrame(e,
-                                        columns=['start_index', 'start_name', 'start_label', 'start_block', 'end_index',
-                                                 'end_name', 'end_label', 'end_block', 'score', 'sign', 'pvalue'])
+                rows = np.searchsorted(offsets, positions, side='right') - 1
+                cols = positions - offsets[rows] + rows + 1
+
+                pvalue = pvalue_matrix[positions] if pvalue_matrix is not None else None
+
+                yield self.__matrixPairs(node_positions[rows], node_positions[cols], score_matrix[positions], pvalue, False)
+
+    def __matrixPairs(self, start_nodes, end_nodes, score, pvalue, duplicates):
+
+        # Pairs outside the peaks and self-loops are dropped
+        keep = (start_nodes >= 0) & (end_nodes >= 0) & (start_nodes != end_nodes)
+
+        start_nodes, end_nodes, score = start_nodes[keep], end_nodes[keep], score[keep]
+        pvalue = pvalue[keep] if pvalue is not None else None
+
+        swapped = start_nodes > end_nodes
+        start_nodes, end_nodes = np.where(swapped, end_nodes, start_nodes), np.where(swapped, start_nodes, end_nodes)
+
+        # A pair stored in both triangles is taken from the row of its start node
+        if duplicates and swapped.any():
+            order = np.lexsort((swapped, end_nodes, start_nodes))
+            first = np.r_[True, (np.diff(start_nodes[order]) != 0) | (np.diff(end_nodes[order]) != 0)]
+            keep = order[first]
+
+            start_nodes, end_nodes, score = start_nodes[keep], end_nodes[keep], score[keep]
+            pvalue = pvalue[keep] if pvalue is not None else None
+
+        return start_nodes, end_nodes, score, pvalue
+
+    def __matrixIndex(self, previous, sweep):
+
+        nodes, blocks, peaks, ranks, node_positions = self.__matrixNodes()
+
+        pvalues_available = self.__matrix['pvalue'] is not None
+        multiple_blocks = blocks[0] != '#no_multiple_blocks'
+
+        if multiple_blocks:
+            pairs = [(start, end) for idx, start in enumerate(blocks) for end in blocks[idx:] if self.__withinBlocks or start != end]
+        else:
+            pairs = [(blocks[0], blocks[0])]
+
+        # Each pair of blocks has its own sweep bound, looked up for every stored pair by the ranks of its blocks
+        bounds = [self.__segmentBound(start, end, pvalues_available, previous, sweep) for start, end in pairs]
+
+        segment_table = np.full((len(blocks), len(blocks)), -1)
+        key_table = np.full((len(blocks), len(blocks)), "score", dtype=object)
+        bound_table = np.full((len(blocks), len(blocks)), -np.inf)
+
+        for segment_id, ((start, end), (key, bound)) in enumerate(zip(pairs, bounds)):
+            start_rank, end_rank = blocks.index(start), blocks.index(end)
+
+            segment_table[start_rank, end_rank] = segment_id
+            key_table[start_rank, end_rank] = key
+            bound_table[start_rank, end_rank] = bound
+
+        qvalues = None
+
+        # q-values need the pvalues of every stored pair of their family, so the matrix is read twice
+        if self.__qvalueNeeded(sweep):
+            tested = [(segment_table[ranks[x[0]], ranks[x[1]]], x[3]) for x in self.__matrixEntries(node_positions)]
+            segment_ids = np.concatenate([x[0] for x in tested]) if len(tested) > 0 else np.empty(0, dtype=int)
+            tested = np.concatenate([x[1] for x in tested]) if len(tested) > 0 else np.empty(0)
+
+            qvalues = self.__qvalueTables(pairs, [tested[segment_ids == x] for x in range(len(pairs))])
+            qvalues = [qvalues[pair] for pair in pairs]
+
+        parts = []
+
+        for start_nodes, end_nodes, score, pvalue in self.__matrixEntries(node_positions):
+            start_ranks, end_ranks = ranks[start_nodes], ranks[end_nodes]
+            segment_ids = segment_table[start_ranks, end_ranks]
+            keys = key_table[start_ranks, end_ranks]
+
+            qvalue = None
+
+            if qvalues is not None:
+                qvalue = np.full(len(pvalue), np.nan)
+
+                for segment_id in np.unique(segment_ids[segment_ids >= 0]):
+                    qvalue[segment_ids == segment_id] = self.__qvalueLookup(qvalues[segment_id], pvalue[segment_ids == segment_id])
+
+            with np.errstate(invalid='ignore'):
+                values = self.__sweepValue("score", np.abs(score))
+
+                if pvalue is not None:
+                    values = np.where(keys == "pvalue", pvalue, values)
+
+                if qvalue is not None:
+                    values = np.where(keys == "qvalue", qvalue, values)
+
+                keep = (segment_ids >= 0) & (values < bound_table[start_ranks, end_ranks])
+
+            parts.append((segment_ids[keep], start_nodes[keep], end_nodes[keep], score[keep],
+                          pvalue[keep] if pvalue is not None else None, qvalue[keep] if qvalue is not None else None))
+
+        if len(parts) == 0:
+            parts = [(np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0),
+                      np.empty(0) if pvalues_available else None, np.empty(0) if qvalues is not None else None)]
+
+        segment_ids, start_nodes, end_nodes, score = [np.concatenate([x[i] for x in parts]) for i in range(4)]
+        pvalue = np.concatenate([x[4] for x in parts]) if pvalues_available else None
+        qvalue = np.concatenate([x[5] for x in parts]) if qvalues is not None else None
+
+        # Pairs are grouped by block pair, and in matrix order within each
+        order = np.lexsort((end_nodes, start_nodes, segment_ids))
+        bounds_in_order = np.searchsorted(segment_ids[order], np.arange(len(pairs) + 1))
+
+        node_lookup = (nodes.index.values, peaks['Name'].values, nodes['Label'].values)
+        columns = self.__edgeColumns(multiple_blocks, pvalues_available)
+
+        segments = []
+
+        for segment_id, ((start, end), (key, bound)) in enumerate(zip(pairs, bounds)):
+            positions = order[bounds_in_order[segment_id]:bounds_in_order[segment_id + 1]]
+
+            segments.append(self.__segment(start, end, columns, key, bound, start_nodes[positions], end_nodes[positions],
+                                           score[positions], pvalue[positions] if pvalue is not None else None,
+                                           node_lookup, node_lookup, qvalue[positions] if qvalue is not None else None))
+
+        return nodes, segments
+
+    def __segmentSelection(self, segment):
+
+        thresholds = self.__thresholds(segment['start_block'], segment['end_block'], segment['pvalue'] is not None)
+        key, value = self.__primaryThreshold(segment['start_block'], segment['end_block'], segment['pvalue'] is not None)
+
+        # The primary threshold is a binary search of the sorted index, and any other threshold filters what it finds
+        selected = segment['order'][:np.searchsorted(segment['sorted'], value, side='left')]
+
+        with np.errstate(invalid='ignore'):
+            for name, threshold in thresholds.items():
+                if name == key:
+                    continue
+
+                if name == 'score':
+                    selected = selected[np.abs(segment['score'][selected]) > threshold]
                 else:
-                    pval = pd.DataFrame(e, columns=['start_index', 'start_name', 'start_label', 'end_index', 'end_name',
-                                                    'end_label', 'score', 'sign', 'pvalue'])
+                    selected = selected[segment[name][selected] < threshold]
 
-            return pval
+        # Edges are returned in matrix order
+        selected = np.sort(selected)
+        filtered = len(selected) > 0
 
-        options = {'score': __score(start_block_nodes, end_block_nodes, SCORE, PVAL, start_block, end_block, blocks,
-                                    hard_threshold),
-                   'pvalue': __pval(start_block_nodes, end_block_nodes, SCORE, PVAL, start_block, end_block, blocks,
-                                    hard_threshold)}
+        selected = selected[self.__signMask(np.sign(segment['score'][selected]))]
 
-        edges = pd.DataFrame()
+        return segment, selected, filtered
 
-        if filter_type.lower() in options:
-            edges = options[filter_type.lower()];
+    def __selectionArrays(self, selection):
+
+        parts = [(segment['score'][positions], segment['start_indexes'][segment['rows'][positions]],
+                  segment['end_indexes'][segment['cols'][positions]],
+                  segment['pvalue'][positions] if segment['pvalue'] is not None else None,
+                  segment['qvalue'][positions] if segment['qvalue'] is not None else None)
+                 for segment, positions, _ in selection]
+
+        if len(parts) == 0:
+            return np.empty(0), np.empty(0, dtype=int), np.empty(0, dtype=int), None, None
+
+        score, start_indexes, end_indexes, pvalue, qvalue = zip(*parts)
+
+        pvalue = np.concatenate(pvalue) if pvalue[0] is not None else None
+        qvalue = np.concatenate(qvalue) if qvalue[0] is not None else None
+
+        return np.concatenate(score), np.concatenate(start_indexes), np.concatenate(end_indexes), pvalue, qvalue
+
+    def __wideEdges(self):
+
+        if self.__selection is None:
+            return pd.DataFrame()
+
+        selection, nearest = self.__selection
+
+        frames = []
+
+        # Empty segments before the first edges are dropped, as the table takes its columns from the first edges found
+        for segment, positions, filtered in selection:
+            dat_edges = self.__segmentEdges(segment, positions, filtered)
+
+            if len(frames) == 1 and frames[0].empty:
+                frames = []
+
+            frames.append(dat_edges)
+
+        if len(frames) == 0:
+            edges = pd.DataFrame()
+        elif len(frames) == 1:
+            edges = frames[0]
         else:
-            print("Error: wrong score type specified. Valid entries are 'Score' or 'Pvalue'.")
+            edges = pd.concat(frames, sort=False).reset_index(drop=True)
+
+        if nearest is not None and not edges.empty:
+            edges = edges[nearest].reset_index(drop=True)
 
-        if sign.lower() == "pos":
-            edges = edges[edges['sign'] > 0].reset_index(drop=True)
-        elif sign.lower() == "neg":
-            edges = edges[edges['sign'] < 0].reset_index(drop=True)
+        if self.__stability is not None:
+            edges['stability'] = self.__stability
 
         return edges
 
+    def __segmentEdges(self, segment, positions, filtered):
+
+        rows, cols = segment['rows'][positions], segment['cols'][positions]
+        score = segment['score'][positions]
+
+        columns = segment['columns'] + (['qvalue'] if self.__qvalueNeeded() else [])
+
+        if not filtered:
+            return pd.DataFrame([], columns=columns)
+
+        edge_data = {'start_index': segment['start_indexes'][rows], 'start_name': segment['start_names'][rows],
+                     'start_label': segment['start_labels'][rows], 'start_block': segment['start_block'],
+                     'end_index': segment['end_indexes'][cols], 'end_name': segment['end_names'][cols],
+                     'end_label': segment['end_labels'][cols], 'end_block': segment['end_block'],
+                     'score': score, 'sign': np.sign(score)}
+
+        if segment['pvalue'] is not None:
+            edge_data['pvalue'] = segment['pvalue'][positions]
+
+        if segment['qvalue'] is not None:
+            edge_data['qvalue'] = segment['qvalue'][positions]
+
+        return pd.DataFrame({column: edge_data[column] for column in columns})
+
+    def __nearestMask(self, score, start_indexes, end_indexes):
+
+        if self.__sign.lower() == "pos":
+            strength = score
+        elif self.__sign.lower() == "neg":
+            strength = -score
+        else:
+            strength = np.abs(score)
+
+        # Each edge is listed under both of its nodes, and each node's list is ordered strongest first
+        node_ids = np.concatenate([start_indexes, end_indexes]).astype(int)
+        edge_ids = np.tile(np.arange(len(score)), 2)
+        strength = np.tile(np.nan_to_num(strength, nan=-np.inf), 2)
+
+        order = np.lexsort((-strength, node_ids))
+        node_ids = node_ids[order]
+
+        starts = np.flatnonzero(np.r_[True, node_ids[1:] != node_ids[:-1]])
+        rank = np.arange(len(node_ids)) - np.repeat(starts, np.diff(np.r_[starts, len(node_ids)]))
+
+        # The number of nodes that keep each edge among their k strongest
+        votes = np.bincount(edge_ids[order][rank < self.__k_nearest], minlength=len(score))
+
+        return votes == 2 if self.__mutual else votes > 0
+
+    def __tableEdgeChunks(self, memory_limit):
+
+        peaktable = self.__peaktable
+        datatable = self.__datatable
+        pvalues = self.__pvalues
+
+        row_names = datatable.index.values
+        column_names = datatable.columns.values
+
+        node_indexes, node_blocks = self.__nodeOrder()
+        labels = pd.Series(peaktable['Label'].values, index=peaktable['Name'].values)
+
+        row_nodes = node_indexes.reindex(row_names).values
+        column_nodes = node_indexes.reindex(column_names).values
+        row_labels = labels.reindex(row_names).values
+        column_labels = labels.reindex(column_names).values
+
+        multiple_blocks = node_blocks is not None
+
+        if multiple_blocks:
+            row_blocks = node_blocks.reindex(row_names).values
+            column_blocks = node_blocks.reindex(column_names).values
+
+            # Blocks are paired in the order the nodes were added, as in build
+            block_rank = {block: rank for rank, block in enumerate(pd.unique(node_blocks.values))}
+            row_ranks = np.array([block_rank[x] for x in row_blocks])
+            column_ranks = np.array([block_rank[x] for x in column_blocks])
+        else:
+            row_blocks = np.full(len(row_names), '#no_multiple_blocks', dtype=object)
+            column_blocks = np.full(len(column_names), '#no_multiple_blocks', dtype=object)
+            row_ranks = np.zeros(len(row_names), dtype=int)
+            column_ranks = np.zeros(len(column_names), dtype=int)
+
+        symmetric = set(row_names) == set(column_names)
+
+        score_values = datatable.values
+        pvalue_values = pvalues.values if pvalues is not None else None
+
+        # Each tile of rows holds its scores, pvalues and masks, so the tile size follows the memory limit
+        tile = max(1, int(memory_limit * 2 ** 20 / (8 * 6 * max(len(column_names), 1))))
+
+        for start in range(0, len(row_names), tile):
+            stop = min(start + tile, len(row_names))
+
+            score = np.asarray(score_values[start:stop], dtype=float)
+            pvalue = np.asarray(pvalue_values[start:stop], dtype=float) if pvalue_values is not None else None
+
+            keep = self.__tileFilter(score, pvalue, row_blocks[start:stop], column_blocks)
+
+            rows, cols = np.nonzero(keep)
+            rows_global = rows + start
+
+            # Pairs between blocks are kept once, and within a block only the upper triangle of a symmetric matrix
+            same_block = row_ranks[rows_global] == column_ranks[cols]
+
+            if symmetric:
+                keep_pair = (row_ranks[rows_global] < column_ranks[cols]) | (same_block & (rows_global <= cols))
+            else:
+                keep_pair = np.ones(len(rows), dtype=bool)
+
+            if multiple_blocks and not self.__withinBlocks:
+                keep_pair &= ~same_block
+
+            keep_pair &= row_nodes[rows_global] != column_nodes[cols]
+            keep_pair &= self.__signMask(np.sign(score[rows, cols]))
+
+            rows, cols, rows_global = rows[keep_pair], cols[keep_pair], rows_global[keep_pair]
+
+            edge_data = {'start_index': row_nodes[rows_global], 'start_name': row_names[rows_global],
+                         'start_label': row_labels[rows_global], 'start_block': row_blocks[rows_global],
+                         'end_index': column_nodes[cols], 'end_name': column_names[cols],
+                         'end_label': column_labels[cols], 'end_block': column_blocks[cols],
+                         'score': score[rows, cols], 'sign': np.sign(score[rows, cols])}
+
+            if pvalue is not None:
+                edge_data['pvalue'] = pvalue[rows, cols]
+
+            columns = [x for x in edge_data if multiple_blocks or x not in ['start_block', 'end_block']]
+
+            yield pd.DataFrame({column: edge_data[column] for column in columns})
+
+    def __matrixEdgeChunks(self, memory_limit):
+
+        nodes, blocks, peaks, ranks, node_positions = self.__matrixNodes()
+
+        names = peaks['Name'].values
+        labels = peaks['Label'].values
+        multiple_blocks = blocks[0] != '#no_multiple_blocks'
+        columns = self.__edgeColumns(multiple_blocks, self.__matrix['pvalue'] is not None)
+
+        for start_nodes, end_nodes, score, pvalue in self.__matrixEntries(node_positions, memory_limit):
+            start_ranks, end_ranks = ranks[start_nodes], ranks[end_nodes]
+
+            keep = self.__entryFilter(score, pvalue, start_ranks, end_ranks, blocks)
+
+            if multiple_blocks and not self.__withinBlocks:
+                keep &= start_ranks != end_ranks
+
+            keep &= self.__signMask(np.sign(score))
+
+            # Edges are written in matrix order within each chunk
+            keep = np.flatnonzero(keep)
+            keep = keep[np.lexsort((end_nodes[keep], start_nodes[keep]))]
+
+            start_nodes, end_nodes, score = start_nodes[keep], end_nodes[keep], score[keep]
+
+            edge_data = {'start_index': start_nodes, 'start_name': names[start_nodes], 'start_label': labels[start_nodes],
+                         'start_block': np.asarray(blocks, dtype=object)[ranks[start_nodes]],
+                         'end_index': end_nodes, 'end_name': names[end_nodes], 'end_label': labels[end_nodes],
+                         'end_block': np.asarray(blocks, dtype=object)[ranks[end_nodes]],
+                         'score': score, 'sign': np.sign(score),
+                         'pvalue': pvalue[keep] if pvalue is not None else None}
+
+            yield pd.DataFrame({column: edge_data[column] for column in columns})
+
+    def __entryFilter(self, score, pvalue, start_ranks, end_ranks, blocks):
+
+        keep = np.zeros(len(score), dtype=bool)
+        pairs = start_ranks * len(blocks) + end_ranks
+
+        for pair in np.unique(pairs):
+            entries = np.flatnonzero(pairs == pair)
+
+            thresholds = self.__thresholds(blocks[pair // len(blocks)], blocks[pair % len(blocks)], pvalue is not None)
+
+            with np.errstate(invalid='ignore'):
+                pair_keep = np.ones(len(entries), dtype=bool)
+
+                if 'score' in thresholds:
+                    pair_keep &= np.abs(score[entries]) > thresholds['score']
+
+                if 'pvalue' in thresholds:
+                    pair_keep &= pvalue[entries] < thresholds['pvalue']
+
+            keep[entries] = pair_keep
+
+        return keep
+
+    def __nodeOrder(self):
+
+        peaktable = self.__peaktable
+        datatable = self.__datatable
+
+        if 'Block' not in peaktable.columns:
+            return pd.Series(np.arange(len(peaktable)), index=peaktable['Name'].values), None
+
+        index_blocks = peaktable[self.__positions['rows'] >= 0].Block.unique()
+        column_blocks = peaktable[self.__positions['columns'] >= 0].Block.unique()
+
+        # build adds each index block, then the column blocks paired with it, in turn
+        symmetric = self.__positions['symmetric']
+        order = []
+
+        for idx, index_block in enumerate(index_blocks):
+            order.extend([index_block] + list(column_blocks[idx if symmetric else 0:]))
+
+        order = list(pd.unique(np.array(order, dtype=object)))
+
+        peaks = pd.concat([peaktable[peaktable['Block'] == block] for block in order])
+
+        return pd.Series(np.arange(len(peaks)), index=peaks['Name'].values), pd.Series(peaks['Block'].values, index=peaks['Name'].values)
+
+    def __tileFilter(self, score, pvalue, row_blocks, column_blocks):
+
+        keep = np.zeros(score.shape, dtype=bool)
+
+        for row_block in pd.unique(row_blocks):
+            rows = np.flatnonzero(row_blocks == row_block)
+
+            for column_block in pd.unique(column_blocks):
+                cols = np.flatnonzero(column_blocks == column_block)
+
+                thresholds = self.__thresholds(row_block, column_block, pvalue is not None)
+
+                with np.errstate(invalid='ignore'):
+                    block_keep = np.ones((len(rows), len(cols)), dtype=bool)
+
+                    if 'score' in thresholds:
+                        block_keep &= np.abs(score[np.ix_(rows, cols)]) > thresholds['score']
+
+                    if 'pvalue' in thresholds:
+                        block_keep &= pvalue[np.ix_(rows, cols)] < thresholds['pvalue']
+
+                keep[np.ix_(rows, cols)] = block_keep
+
+        return keep
+
+    def __writeChunk(self, writer, path, file_format, edges):
+
+        if file_format == "csv":
+            edges.to_csv(path, mode='w' if writer is None else 'a', header=writer is None, index=False)
+
+            return True
+
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.Table.from_pandas(edges, preserve_index=False)
+
+        if writer is None:
+            writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+
+        writer.write_table(table.cast(writer.schema))
+
+        return writer
+
+    def __signMask(self, score):
+
+        if self.__sign.lower() == "pos":
+            return score > 0
+        elif self.__sign.lower() == "neg":
+            return score < 0
+
+        return np.ones(len(score), dtype=bool)
+
+    def __thresholds(self, start_block, end_block, pvalues_available):
+
+        thresholds = self.__hard_threshold
+
+        for blocks in [(start_block, end_block), (end_block, start_block)]:
+            if blocks in self.__block_thresholds:
+                thresholds = self.__block_thresholds[blocks]
+                break
+
+        # A single threshold applies to the filter type, falling back to the score when there are no pvalues
+        if not isinstance(thresholds, dict):
+            thresholds = {'score' if not pvalues_available else self.__filter_type.lower(): thresholds}
+
+        return thresholds
+
+    def __primaryThreshold(self, start_block, end_block, pvalues_available):
+
+        thresholds = self.__thresholds(start_block, end_block, pvalues_available)
+
+        # The index is swept on a q-value threshold when there is one, then on a pvalue threshold
+        key = [x for x in ['qvalue', 'pvalue', 'score'] if x in thresholds][0]
+
+        return key, self.__sweepValue(key, thresholds[key])
+
+    def __sweepValue(self, key, threshold):
+
+        # Edges pass when their sweep value is below the threshold's, so scores are swept on -|score|
+        return -threshold if key == 'score' else threshold
+
+    def __indexCovers(self, sweep=None):
+
+        if self.__index is None or self.__index['withinBlocks'] != self.__withinBlocks:
+            return False
+
+        if self.__qvalueNeeded(sweep) and self.__index['qvalue_scope'] != self.__qvalue_scope:
+            return False
+
+        for segment in self.__index['segments']:
+            if sweep is None:
+                key, value = self.__primaryThreshold(segment['start_block'], segment['end_block'], segment['pvalue'] is not None)
+            else:
+                key, value = sweep
+
+            if key != segment['key'] or value > segment['bound']:
+                return False
+
+        return True
+
     def __setNodes(self, nodes):
 
         self.__nodes = nodes
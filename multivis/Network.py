@@ -11,37 +11,45 @@ class Network(Edge):
         Initial_Parameters
         ----------
         peaktable : Pandas dataframe containing peak data. Must contain 'Name' and 'Label'.
-        datatable : Pandas dataframe matrix containing scores
-        pvalues : Pandas dataframe matrix containing score/similarity pvalues (if available)
+        datatable : Pandas dataframe matrix containing scores, or a scipy sparse, numpy array/memmap or condensedMatrix matrix of symmetric scores
+        pvalues : Pandas dataframe matrix (or matrix of the same type as datatable) containing score/similarity pvalues (if available)
+        names : The row/column names of a scipy sparse or numpy array/memmap datatable (default: None uses the peaktable 'Name' column order)
 
         Methods
         -------
         set_params : Set parameters -
-            filter_type: The value type to filter the data on (default: 'pvalue')
-            hard_threshold: Value to filter the data on (default: 0.005)
-            link_type: The value type to represent links in the network (default: 'score')
+            filter_type: The value type to filter the data on ('pvalue', 'qvalue' or 'score'). Qvalues are Benjamini-Hochberg adjusted pvalues and are added to the edges as a 'qvalue' column (default: 'pvalue')
+            hard_threshold: Value to filter the data on, or a dictionary of values keyed by 'pvalue', 'qvalue' and/or 'score' to filter on several at once (default: 0.005)
+            link_type: The value type to represent links in the network ('score', 'pvalue' or 'qvalue') (default: 'score')
             withinBlocks: Include scores within blocks if building multi-block network (default: False)
             sign: The sign of the score/similarity to filter on ('pos', 'neg' or 'both') (default: 'both')
+            block_thresholds: A dictionary of hard_threshold values for particular pairs of blocks, keyed by (block, block) tuples, in place of hard_threshold (default: None)
+            k_nearest: Keep only the k strongest of each node's edges passing the filter (default: None keeps every edge)
+            mutual: Keep an edge only if it is among the k strongest edges of both of its nodes, when k_nearest is set (default: False)
+            n_jobs: The number of threads to index the block pairs and run the stability resamples on (-1 uses all processors) (default: 1)
+            qvalue_scope: Adjust the pvalues for multiple testing over all of the tested pairs at once ('global') or over each pair of blocks separately ('block') (default: 'global')
 
         help : Print this help text
 
-        build : Builds nodes, edges and NetworkX graph.
-        getNetworkx : Returns a NetworkX graph.
+        build : Builds nodes and edges. The NetworkX graph is built when it is first asked for.
+        getNetworkx : Returns a NetworkX graph, with links weighted on link_type (default: None uses the link_type parameter). Each link type's graph is built once from the same edges.
         getLinkType : Returns the link type parameter used in building the network.
     """
 
-    def __init__(self, peaktable, datatable, pvalues):
+    def __init__(self, peaktable, datatable, pvalues, names=None):
 
-        Edge.__init__(self, peaktable, datatable, pvalues)
+        self.__graphs = {}
+
+        Edge.__init__(self, peaktable, datatable, pvalues, names)
 
         self.set_params()
 
     def help(self):
         print(Network.usage)
 
-    def set_params(self, filter_type='pvalue', hard_threshold=0.005, link_type='score', withinBlocks=False, sign='both'):
+    def set_params(self, filter_type='pvalue', hard_threshold=0.005, link_type='score', withinBlocks=False, sign='both', block_thresholds=None, k_nearest=None, mutual=False, n_jobs=1, qvalue_scope='global'):
 
-        Edge.set_params(self, filter_type, hard_threshold, withinBlocks, sign)
+        Edge.set_params(self, filter_type, hard_threshold, withinBlocks, sign, block_thresholds, k_nearest, mutual, n_jobs, qvalue_scope)
 
         link_type = self.__paramCheck(link_type)
 
@@ -51,11 +59,16 @@ class Network(Edge):
 
         Edge.build(self)
 
-        self.__networkXEdges()
+        self.__graphs = {}
+
+    def getNetworkx(self, link_type=None):
+
+        link_type = self.getLinkType().lower() if link_type is None else self.__paramCheck(link_type).lower()
 
-    def getNetworkx(self):
+        if link_type not in self.__graphs:
+            self.__graphs[link_type] = self.__networkXEdges(link_type)
 
-        return self.__g
+        return self.__graphs[link_type]
 
     def getLinkType(self):
 
@@ -63,55 +76,33 @@ class Network(Edge):
 
     def __paramCheck(self, link_type):
 
-        if link_type.lower() not in ["pvalue", "score"]:
-            print("Error: Link type not valid. Choose either \"Pvalue\" or \"Score\".")
+        if link_type.lower() not in ["pvalue", "qvalue", "score"]:
+            print("Error: Link type not valid. Choose either \"Pvalue\", \"Qvalue\" or \"Score\".")
             sys.exit()
 
         return link_type
 
-    def __networkXEdges(self):
+    def __networkXEdges(self, link_type):
 
         nodes = self.getNodes()
         edges = self.getEdges()
 
-        if 'Block' in nodes.columns:
-            blocks = list(nodes['Block'].unique())
-        else:
-            blocks = ['#no_multiple_blocks']
-
         g = nx.Graph()
 
-        if "pvalue" in edges.columns:
-
-            if blocks[0] != '#no_multiple_blocks':
-
-                for source_index, _, source, source_block, target_index, _, target, target_block, score, _, pvalue in edges.values:
-                    if self.getLinkType().lower() == "pvalue":
-                        g.add_edge(source_index, target_index, weight=pvalue)
-                    elif self.getLinkType().lower() == "score":
-                        g.add_edge(source_index, target_index, weight=score)
-            else:
-                for source_index, _, source, target_index, _, target, score, _, pvalue in edges.values:
-                    if self.getLinkType().lower() == "pvalue":
-                        g.add_edge(source_index, target_index, weight=pvalue)
-                    elif self.getLinkType().lower() == "score":
-                        g.add_edge(source_index, target_index, weight=score)
-        else:
+        if edges.empty:
+            return g
 
-            if blocks[0] != '#no_multiple_blocks':
-                for source_index, _, source, source_block, target_index, _, target, target_block, score, _ in edges.values:
-                    g.add_edge(source_index, target_index, weight=score)
-            else:
-                for source_index, _, source, target_index, _, target, score, _ in edges.values:
-                    g.add_edge(source_index, target_index, weight=score)
+        # Links are weighted on the score unless the edges carry the pvalues or qvalues asked for
+        weights = edges[link_type if link_type in edges.columns else "score"]
 
-        nx.set_node_attributes(g, nodes.to_dict('index'))
+        # The graph is built from the edge columns in one call, and only the nodes on an edge take their attributes
+        g.add_weighted_edges_from(zip(edges['start_index'].tolist(), edges['end_index'].tolist(), weights.tolist()))
 
-        self.__setNetworkx(g)
+        present = pd.unique(np.concatenate([edges['start_index'].values, edges['end_index'].values]))
 
-    def __setNetworkx(self, g):
+        nx.set_node_attributes(g, dict(zip(present.tolist(), nodes.loc[present].to_dict('records'))))
 
-        self.__g = g
+        return g
 
     def __setLinkType(self, link_type):
 
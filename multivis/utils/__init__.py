@@ -1,10 +1,13 @@
 from .scaleData import scaleData
 from .scaler import scaler
 from .cluster import cluster
-from .corrAnalysis import corrAnalysis
+from .condensedMatrix import condensedMatrix
+from .corrAnalysis import corrAnalysis, corrEdges
+from .corrAccumulator import corrAccumulator
+from .corrNeighbours import corrNeighbours
 from .mergeBlocks import mergeBlocks
 from .loadData import loadData
 from .statistics import statistics
 from .imputeData import imputeData
 
-__all__ = ["scaleData", "scaler", "corrAnalysis", "cluster", "mergeBlocks", "loadData", "statistics", "imputeData"]
+__all__ = ["scaleData", "scaler", "condensedMatrix", "corrAnalysis", "corrEdges", "corrAccumulator", "corrNeighbours", "cluster", "mergeBlocks", "loadData", "statistics", "imputeData"]
@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import scipy.spatial as sp, scipy.cluster.hierarchy as hc
 from scipy.spatial.distance import squareform
+from .condensedMatrix import condensedMatrix
 
 def cluster(matrix, transpose_non_similarity, is_similarity, distance_metric, linkage_method):
     """Performs linkage clustering given a matrix of values. If the matrix does not contain correlation coefficients, then the spatial distance
@@ -10,7 +11,7 @@ def cluster(matrix, transpose_non_similarity, is_similarity, distance_metric, li
 
         Parameters
         ----------
-        matrix : A Pandas dataframe matrix of scores
+        matrix : A Pandas dataframe matrix of scores, a condensedMatrix of similarity scores, or a square numpy array/memmap of similarity scores
         transpose_non_similarity : Setting to 'True' will transpose the matrix if it is not a similarity matrix
         is_similarity : Setting to 'True' will treat the matrix as if it contains similarity values/correlation coefficients
         distance_metric : Set the distance metric. Used if the matrix does not contain correlation coefficients.
@@ -27,25 +28,55 @@ def cluster(matrix, transpose_non_similarity, is_similarity, distance_metric, li
 
     if is_similarity:
 
-        Z = (matrix.values + matrix.values.T) / 2
+        if isinstance(matrix, condensedMatrix):
+            # Already symmetric with the diagonal left out, so the condensed dissimilarities follow directly
+            dissimilarity = 1 - np.abs(matrix.getCondensed())
+        elif isinstance(matrix, np.ndarray):
+            dissimilarity = __condensedDissimilarity(matrix)
+        else:
+            Z = (matrix.values + matrix.values.T) / 2
 
-        np.fill_diagonal(Z, 1)
+            np.fill_diagonal(Z, 1)
 
-        dissimilarity = 1 - np.abs(Z)
+            dissimilarity = squareform(1 - np.abs(Z))
 
-        linkage = hc.linkage(squareform(dissimilarity), linkage_method)
+        linkage = hc.linkage(dissimilarity, linkage_method)
 
         row_linkage = linkage;
         col_linkage = linkage;
     else:
+        if isinstance(matrix, condensedMatrix):
+            matrix = matrix.getDataFrame()
+
         if transpose_non_similarity:
             matrix = matrix.T
 
+        values = matrix if isinstance(matrix, np.ndarray) else matrix.values
+
         row_linkage, col_linkage = (hc.linkage(sp.distance.pdist(x, distance_metric), linkage_method)
-                                    for x in (matrix.values, matrix.values.T))
+                                    for x in (values, values.T))
 
     return matrix, row_linkage, col_linkage
 
+def __condensedDissimilarity(matrix, tile=1024):
+
+    # Reads a (possibly memory-mapped) similarity matrix a block of rows at a time into the condensed dissimilarities,
+    # so only the condensed vector and one block are held in memory
+    p = matrix.shape[0]
+    dissimilarity = np.empty(p * (p - 1) // 2)
+
+    for start in range(0, p, tile):
+        stop = min(start + tile, p)
+
+        Z = (np.asarray(matrix[start:stop, start:]) + np.asarray(matrix[start:, start:stop]).T) / 2
+
+        upper = np.triu(np.ones(Z.shape, dtype=bool), 1)
+        offset = start * p - start * (start + 1) // 2
+
+        dissimilarity[offset:offset + upper.sum()] = 1 - np.abs(Z[upper])
+
+    return dissimilarity
+
 def __checkData(matrix, transpose_non_similarity, is_similarity, distance_metric, linkage_method):
 
     VALID_METRICS = ['euclidean', 'l2', 'l1', 'manhattan', 'cityblock', 'braycurtis', 'canberra', 'chebyshev', 'correlation',
@@ -56,8 +87,12 @@ def __checkData(matrix, transpose_non_similarity, is_similarity, distance_metric
 
     EUCLIDEAN_LINKAGE_METHODS = ['centroid', 'median', 'ward']
 
-    if not isinstance(matrix, pd.DataFrame):
-        print("Error: A dataframe was not entered. Please check your data.")
+    if not isinstance(matrix, (pd.DataFrame, condensedMatrix, np.ndarray)):
+        print("Error: A dataframe, condensedMatrix or numpy array was not entered. Please check your data.")
+        sys.exit()
+
+    if isinstance(matrix, np.ndarray) and (matrix.ndim != 2 or (is_similarity and matrix.shape[0] != matrix.shape[1])):
+        print("Error: The numpy matrix is not valid. A similarity matrix must be square. Please check your data.")
         sys.exit()
 
     if not type(transpose_non_similarity) == bool:
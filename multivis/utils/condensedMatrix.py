@@ -0,0 +1,72 @@
+import sys
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import squareform
+
+class condensedMatrix:
+    usage = """Stores a symmetric matrix as its condensed upper triangle (scipy squareform layout) and its diagonal. The full Pandas
+    dataframe matrix is only built when it is asked for.
+
+        Initial_Parameters
+        ----------
+        values : A 1D numpy array of the upper triangle values in squareform order
+        names : The row/column names of the matrix
+        diagonal : The diagonal values, either a single value or one value per name (default: 1)
+
+        Methods
+        -------
+        help : Print this help text
+
+        getCondensed : Returns the condensed upper triangle values.
+        getDiagonal : Returns the diagonal values.
+        getNames : Returns the row/column names.
+        getDataFrame : Returns the full Pandas dataframe matrix, built on the first request.
+    """
+
+    def __init__(self, values, names, diagonal=1):
+
+        values, names, diagonal = self.__checkData(values, names, diagonal)
+
+        self.__values = values
+        self.__names = names
+        self.__diagonal = diagonal
+
+        self.__dataframe = None
+
+    def help(self):
+        print(condensedMatrix.usage)
+
+    def getCondensed(self):
+
+        return self.__values
+
+    def getDiagonal(self):
+
+        return self.__diagonal
+
+    def getNames(self):
+
+        return self.__names
+
+    def getDataFrame(self):
+
+        if self.__dataframe is None:
+            matrix = squareform(self.__values, checks=False)
+            np.fill_diagonal(matrix, self.__diagonal)
+
+            self.__dataframe = pd.DataFrame(matrix, index=self.__names, columns=self.__names)
+
+        return self.__dataframe
+
+    def __checkData(self, values, names, diagonal):
+
+        values = np.asarray(values, dtype=float)
+        names = pd.Index(names)
+
+        if values.ndim != 1 or len(values) != len(names) * (len(names) - 1) // 2:
+            print("Error: The condensed values do not match the number of names. Please check your data.")
+            sys.exit()
+
+        diagonal = np.broadcast_to(np.asarray(diagonal, dtype=float), (len(names),)).copy()
+
+        return values, names, diagonal
@@ -0,0 +1,109 @@
+import sys
+import numpy as np
+import pandas as pd
+from .corrAnalysis import _pearsonFromSums, _pvalues
+
+class corrAccumulator:
+    usage = """Accumulates the pairwise-complete sufficient statistics (counts, sums, sums of squares and cross-products) of a matrix of values,
+    so that Pearson correlations can be updated as new samples arrive without revisiting the samples already seen.
+
+        Initial_Parameters
+        ----------
+        df_data : A Pandas dataframe matrix of values (samples as rows) to start from
+
+        Methods
+        -------
+        help : Print this help text
+
+        update : Folds new samples (a Pandas dataframe containing the same columns) into the statistics.
+        calculate : Returns the Pandas dataframe matrices of correlation coefficients and pvalues over all samples so far.
+        getSamples : Returns the number of samples accumulated so far.
+        save : Saves the statistics to a numpy .npz file.
+        load : Returns a corrAccumulator from statistics saved with save.
+    """
+
+    def __init__(self, df_data):
+
+        df_data = self.__checkData(df_data)
+
+        X = df_data.values.astype(float)
+
+        # Values are accumulated relative to the first batch's column means, which keeps the sums well conditioned
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(X, axis=0)) if X.shape[0] > 0 else np.zeros(X.shape[1])
+
+        p = X.shape[1]
+
+        self.__setStatistics(list(df_data.columns), shift, 0, np.zeros((p, p)), np.zeros((p, p)), np.zeros((p, p)), np.zeros((p, p)))
+
+        self.update(df_data)
+
+    def help(self):
+        print(corrAccumulator.usage)
+
+    def update(self, df_data):
+
+        df_data = self.__checkData(df_data)
+
+        if not set(self.__names).issubset(set(df_data.columns)):
+            print("Error: The new samples do not contain every column of the accumulated data. Please check your data.")
+            sys.exit()
+
+        X = df_data[self.__names].values.astype(float) - self.__shift
+
+        M = ~np.isnan(X)
+        m = M.astype(float)
+        Xc = np.where(M, X, 0.0)
+
+        self.__n += m.T @ m
+        self.__sx += Xc.T @ m
+        self.__sxx += (Xc * Xc).T @ m
+        self.__sxy += Xc.T @ Xc
+        self.__samples += X.shape[0]
+
+    def calculate(self):
+
+        r = _pearsonFromSums(self.__n, self.__sx, self.__sx.T, self.__sxx, self.__sxx.T, self.__sxy)
+
+        diagonal = np.diag(r)
+        np.fill_diagonal(r, np.where(np.isnan(diagonal), np.nan, 1.0))
+
+        df_corr = pd.DataFrame(r, index=self.__names, columns=self.__names)
+        df_pval = pd.DataFrame(_pvalues(r, self.__n), index=self.__names, columns=self.__names)
+
+        return df_corr, df_pval
+
+    def getSamples(self):
+
+        return self.__samples
+
+    def save(self, path):
+
+        np.savez(path, names=np.asarray(self.__names, dtype=str), shift=self.__shift, samples=self.__samples, n=self.__n, sx=self.__sx, sxx=self.__sxx, sxy=self.__sxy)
+
+    @staticmethod
+    def load(path):
+
+        with np.load(path) as data:
+            accumulator = corrAccumulator.__new__(corrAccumulator)
+            accumulator.__setStatistics(list(data['names']), data['shift'], int(data['samples']), data['n'], data['sx'], data['sxx'], data['sxy'])
+
+        return accumulator
+
+    def __checkData(self, df):
+
+        if not isinstance(df, pd.DataFrame):
+            print("Error: A dataframe was not entered. Please check your data.")
+            sys.exit()
+
+        return df
+
+    def __setStatistics(self, names, shift, samples, n, sx, sxx, sxy):
+
+        self.__names = names
+        self.__shift = shift
+        self.__samples = samples
+        self.__n = n
+        self.__sx = sx
+        self.__sxx = sxx
+        self.__sxy = sxy
@@ -1,65 +1,1028 @@
+import os
 import sys
+import math
+from concurrent.futures import ProcessPoolExecutor
 from scipy import stats
+from sklearn.covariance import LedoitWolf, shrunk_covariance
 from tqdm import tqdm
 import numpy as np
 import pandas as pd
+from .condensedMatrix import condensedMatrix
 
-def corrAnalysis(df_data, correlationType):
+def corrAnalysis(df_data, correlationType, n_jobs=1, condensed=False, memmap_dir=None, memory_limit=1024, df_data_y=None, blocks=None, permutations=0, seed=None, ci_alpha=None, partial=False, overwrite=False):
     """Performs correlation analysis on a given matrix of values.
 
         Parameters
         ----------
         df_data : A Pandas dataframe matrix of values
         correlationType : The correlation type to apply. Either 'Pearson', 'Spearman' or 'KendallTau'
+        n_jobs : The number of processes to use for 'KendallTau' and permutations (-1 uses all processors) (default: 1)
+        condensed : Setting to 'True' computes only the upper triangle and returns it as a condensedMatrix, which builds the dataframe matrix on request (default: False)
+        memmap_dir : A directory to write the matrices to block by block as memory-mapped 'corr.npy' and 'pval.npy' files, for data too wide to hold in memory (default: None)
+        memory_limit : The memory in megabytes to use for each block when condensed is 'True' or memmap_dir is set (default: 1024)
+        df_data_y : A second Pandas dataframe matrix of values on the same samples (rows). Only the df_data columns against the df_data_y columns are correlated (default: None)
+        blocks : The block of each df_data column, e.g. the Peak Table 'Block' column from mergeBlocks, as a list or a Pandas series indexed by Name. Only pairs between different blocks are correlated (default: None)
+        permutations : The number of sample permutations to derive 'Pearson' or 'Spearman' pvalues from, instead of the t distribution. With partial, the number of permutations to pool the partial pvalues over (default: 0, or with partial enough permutations for at least 100000 null partial correlations, up to 1000)
+        seed : The random seed for the permutations (default: None)
+        ci_alpha : The significance level of Fisher z confidence intervals to return for every correlation, e.g. 0.05 for 95% intervals (default: None)
+        partial : Setting to 'True' gives 'Pearson' or 'Spearman' partial correlations, each pair conditioned on every other column, from a Ledoit-Wolf shrinkage estimate of the precision matrix. The pvalues come from a null distribution of the shrunk partial correlations, pooled over every pair of data with each column permuted on its own and refitted at the observed shrinkage, so they are available with fewer samples than columns. The data must not contain missing values (default: False)
+        overwrite : Setting to 'True' replaces the 'corr.npy' and 'pval.npy' files already in memmap_dir. Memmaps returned by an earlier call keep reading the replaced files (default: False)
 
         Returns
         -------
-        df_corr : Pandas dataframe matrix of all correlation coefficients
-        df_pval : Pandas dataframe matrix of all correlation pvalues
+        df_corr : Pandas dataframe matrix of all correlation coefficients (a condensedMatrix if condensed is 'True', or a read-only numpy memmap in df_data column order if memmap_dir is set)
+        df_pval : Pandas dataframe matrix of all correlation pvalues (a condensedMatrix if condensed is 'True', or a read-only numpy memmap in df_data column order if memmap_dir is set)
+
+        With df_data_y, or blocks with two blocks, the matrices are rectangular with the (first block) df_data columns as the index and the (second block) df_data_y columns as the columns.
+        With blocks with more than two blocks, the matrices are square with the pairs within a block left as NaN.
+        With permutations, df_pval holds the permutation pvalues and a third matrix, df_pval_maxT, holds the pvalues adjusted for
+        multiple testing by the maximum statistic over each permutation. With partial, only df_corr and df_pval are returned.
+        With ci_alpha, two more matrices, df_lower and df_upper, hold the lower and upper confidence limits of each correlation.
+    """
+
+    df_data, correlationType, n_jobs, condensed, memmap_dir, memory_limit = __checkData(df_data.astype(float), correlationType, n_jobs, condensed, memmap_dir, memory_limit, overwrite)
+    df_data_y, blocks = __checkCrossData(df_data, df_data_y, blocks, condensed, memmap_dir)
+    permutations = __checkPermutations(correlationType, permutations, blocks, condensed, memmap_dir)
+    ci_alpha = __checkIntervals(ci_alpha, condensed, memmap_dir)
+    partial = __checkPartial(df_data, correlationType, partial, condensed, memmap_dir, df_data_y, blocks, permutations, ci_alpha)
+
+    if blocks is not None:
+        block_names = list(pd.unique(blocks))
+
+        if len(block_names) == 2:
+            df_data, df_data_y = df_data.loc[:, blocks == block_names[0]], df_data.loc[:, blocks == block_names[1]]
+        else:
+            corr, pval, n = __crossBlocks(df_data.values, blocks, block_names, correlationType, n_jobs)
+
+            return __results(df_data.columns, df_data.columns, correlationType, ci_alpha, n, corr, pval)
+
+    X = df_data.values
+
+    if partial:
+        corr, pval = __partial(X, correlationType, permutations, seed)
+
+        return pd.DataFrame(corr, index=df_data.columns, columns=df_data.columns), pd.DataFrame(pval, index=df_data.columns, columns=df_data.columns)
+
+    if memmap_dir is not None:
+        return __memmap(X, correlationType, n_jobs, memmap_dir, memory_limit)
+
+    if condensed:
+        corr, pval, corr_diagonal, pval_diagonal = __condensed(X, correlationType, n_jobs, memory_limit)
+
+        return condensedMatrix(corr, df_data.columns, corr_diagonal), condensedMatrix(pval, df_data.columns, pval_diagonal)
+
+    Y = None if df_data_y is None else df_data_y.values
+    columns = df_data.columns if df_data_y is None else df_data_y.columns
+
+    if permutations > 0:
+        corr, pval, pval_maxT, n = __permutation(X, Y, correlationType, permutations, seed, n_jobs)
+
+        return __results(df_data.columns, columns, correlationType, ci_alpha, n, corr, pval, pval_maxT)
+
+    corr, pval, n = __dense(X, Y, correlationType, n_jobs)
+
+    return __results(df_data.columns, columns, correlationType, ci_alpha, n, corr, pval)
+
+def corrEdges(df_data, correlationType, filter_type='pvalue', hard_threshold=0.005, sign='both', peaktable=None, n_jobs=1, memory_limit=1024):
+    """Streams the correlations of a matrix of values that pass a threshold as chunks of edges, one block of rows at a
+    time, without building the full correlation or pvalue matrices.
+
+        Parameters
+        ----------
+        df_data : A Pandas dataframe matrix of values
+        correlationType : The correlation type to apply. Either 'Pearson', 'Spearman' or 'KendallTau'
+        filter_type : The value type to filter the correlations on. Either 'pvalue' or 'score' (default: 'pvalue')
+        hard_threshold : Value to filter the correlations on (default: 0.005)
+        sign : The sign of the correlations to keep ('pos', 'neg' or 'both') (default: 'both')
+        peaktable : Pandas dataframe containing peak data with 'Name' and 'Label', used for the edge indexes and labels (default: None uses the df_data column positions and names)
+        n_jobs : The number of processes to use for 'KendallTau' (-1 uses all processors) (default: 1)
+        memory_limit : The memory in megabytes to use for each block of rows (default: 1024)
+
+        Yields
+        -------
+        edges : Pandas dataframe of the edges in each block of rows, in the column layout of Edge.getEdges()
+    """
+
+    df_data, correlationType, n_jobs, _, _, memory_limit = __checkData(df_data.astype(float), correlationType, n_jobs, False, None, memory_limit)
+    filter_type, hard_threshold, sign, indexes, names, labels = __checkEdgeParams(df_data, filter_type, hard_threshold, sign, peaktable)
+
+    X = df_data.values
+    p = X.shape[1]
+
+    R = _rank(X) if correlationType.lower() == "spearman" else None
+
+    tile = max(1, __tileElements(memory_limit) // max(p, 1))
+
+    for start in tqdm(range(0, p, tile)):
+        stop = min(start + tile, p)
+
+        r, pv = __block(X, R, correlationType, start, stop, start, p, n_jobs)
+
+        if filter_type.lower() == "score":
+            keep = np.abs(r) > hard_threshold
+        else:
+            keep = pv < hard_threshold
+
+        if sign.lower() == "pos":
+            keep &= r > 0
+        elif sign.lower() == "neg":
+            keep &= r < 0
+
+        rows, cols = np.nonzero(np.triu(keep, 1))
+
+        if len(rows) == 0:
+            continue
+
+        score = r[rows, cols]
+        rows = rows + start
+        cols = cols + start
+
+        yield pd.DataFrame({'start_index': indexes[rows], 'start_name': names[rows], 'start_label': labels[rows],
+                            'end_index': indexes[cols], 'end_name': names[cols], 'end_label': labels[cols],
+                            'score': score, 'sign': np.sign(score), 'pvalue': pv[rows - start, cols - start]})
+
+def _pearson(X, Y=None):
+    """Pearson correlation of every column of X against every column of Y (X against itself if Y is None), using the
+    pairwise-complete observations of each column pair. Returns the coefficient matrix and the pairwise-complete counts.
+    """
+
+    symmetric = Y is None
+
+    Xc, Mx = __centre(X)
+
+    if symmetric:
+        Yc, My = Xc, Mx
+    else:
+        Yc, My = __centre(Y)
+
+    if Mx.all() and My.all():
+        # No missing values, so every pair shares the same rows and the sums reduce to column vectors
+        n = np.full((Xc.shape[1], Yc.shape[1]), float(Xc.shape[0]))
+
+        r = _pearsonFromSums(n, Xc.sum(axis=0)[:, None], Yc.sum(axis=0)[None, :],
+                             (Xc * Xc).sum(axis=0)[:, None], (Yc * Yc).sum(axis=0)[None, :], Xc.T @ Yc)
+    else:
+        # Missing values are zeroed in the centred data, so masked matrix products give the pairwise-complete sums
+        mx = Mx.astype(float)
+        my = mx if symmetric else My.astype(float)
+
+        n = mx.T @ my
+
+        r = _pearsonFromSums(n, Xc.T @ my, mx.T @ Yc, (Xc * Xc).T @ my, mx.T @ (Yc * Yc), Xc.T @ Yc)
+
+    if symmetric:
+        diagonal = np.diag(r)
+        np.fill_diagonal(r, np.where(np.isnan(diagonal), np.nan, 1.0))
+
+    return r, n
+
+def _pearsonPairs(X, rows, cols):
+    """Pearson correlation of only the column pairs (X[:, rows[k]], X[:, cols[k]]), using the pairwise-complete
+    observations of each pair. Gives the same values as _pearson, in chunks of pairs. Returns the coefficients and the
+    pairwise-complete counts.
     """
 
-    df_data, correlationType = __checkData(df_data.astype(float), correlationType)
+    Xc, M = __centre(X)
+    m = M.astype(float)
+
+    r = np.full(len(rows), np.nan)
+    n = np.zeros(len(rows))
+
+    chunk = max(1, 2 ** 20 // max(X.shape[0], 1))
 
-    df_corr = pd.DataFrame()
-    df_pval = pd.DataFrame()
+    for start in range(0, len(rows), chunk):
+        i = rows[start:start + chunk]
+        j = cols[start:start + chunk]
 
-    for i in tqdm(df_data.columns):
+        xi, xj, mi, mj = Xc[:, i], Xc[:, j], m[:, i], m[:, j]
 
-        corrList = []
-        pvalList = []
+        n[start:start + chunk] = (mi * mj).sum(axis=0)
+        r[start:start + chunk] = _pearsonFromSums(n[start:start + chunk], (xi * mj).sum(axis=0), (xj * mi).sum(axis=0),
+                                                  (xi * xi * mj).sum(axis=0), (xj * xj * mi).sum(axis=0), (xi * xj).sum(axis=0))
 
-        for a in df_data.columns:
+    return r, n
 
-            mask = ~np.isnan(df_data[i].values) & ~np.isnan(df_data[a].values)
-            x = df_data[i].values[mask]
-            y = df_data[a].values[mask]
+def _bootstrapPairs(X, rows, cols, counts, correlationType, memory_limit=1024):
+    """Pearson or Spearman correlation of the column pairs (X[:, rows[k]], X[:, cols[k]]) in each bootstrap resample of
+    the rows of X, given as a matrix of counts (one row per resample, one column per row of X, as from
+    numpy.random.Generator.multinomial). A row drawn c times is weighted by c, so every resample is a batch of weighted
+    sums, and for Pearson a matrix product with the counts. Spearman ranks are taken over each resample's
+    pairwise-complete rows, with repeated rows as ties. Returns the coefficients and the pairwise-complete counts, one
+    row per resample.
+    """
+
+    counts = np.asarray(counts, dtype=float)
+
+    r = np.full((counts.shape[0], len(rows)), np.nan)
+    n = np.zeros(r.shape)
+
+    if correlationType.lower() == "pearson":
+        Xc, M = __centre(X)
+        m = M.astype(float)
+
+        chunk = max(1, __tileElements(memory_limit) // max(X.shape[0] + counts.shape[0], 1))
+    else:
+        Xc = X
+        m = (~np.isnan(X)).astype(float)
+
+        chunk = max(1, __tileElements(memory_limit) // max(X.shape[0] * counts.shape[0], 1))
 
-            if correlationType.lower() == "pearson":
-                corr, pval = stats.pearsonr(x, y)
-            elif correlationType.lower() == "spearman":
-                corr, pval = stats.spearmanr(x, y)
-            elif correlationType.lower() == "kendalltau":
-                corr, pval = stats.kendalltau(x, y)
+    for start in range(0, len(rows), chunk):
+        i = rows[start:start + chunk]
+        j = cols[start:start + chunk]
 
-            corrList.append(corr)
-            pvalList.append(pval)
+        xi, xj, mi, mj = Xc[:, i], Xc[:, j], m[:, i], m[:, j]
 
-        if df_corr.empty:
-            df_corr = pd.DataFrame(np.column_stack(corrList), columns=df_data.columns)
-            df_pval = pd.DataFrame(np.column_stack(pvalList), columns=df_data.columns)
+        if correlationType.lower() == "pearson":
+            n[:, start:start + chunk] = counts @ (mi * mj)
+            r[:, start:start + chunk] = _pearsonFromSums(n[:, start:start + chunk], counts @ (xi * mj), counts @ (xj * mi),
+                                                         counts @ (xi * xi * mj), counts @ (xj * xj * mi), counts @ (xi * xj))
         else:
-            dat_corr = pd.DataFrame(np.column_stack(corrList), columns=df_data.columns)
-            df_corr = pd.concat([df_corr, dat_corr]);
+            # Weights of each resample, pair and row, with the rows missing from either column weighted out
+            w = counts[:, None, :] * (mi * mj).T[None, :, :]
+
+            ri = __weightedRanks(xi, w)
+            rj = __weightedRanks(xj, w)
+
+            n[:, start:start + chunk] = w.sum(axis=-1)
+            r[:, start:start + chunk] = _pearsonFromSums(n[:, start:start + chunk], (w * ri).sum(axis=-1), (w * rj).sum(axis=-1),
+                                                         (w * ri * ri).sum(axis=-1), (w * rj * rj).sum(axis=-1),
+                                                         (w * ri * rj).sum(axis=-1))
+
+    return r, n
+
+def _spearman(X, Y=None, RX=None, RY=None):
+    """Spearman correlation of every column of X against every column of Y (X against itself if Y is None), using the
+    pairwise-complete observations of each column pair. Each column is ranked once (average ranks for ties) and the
+    ranks are correlated in one batch, with only pairs whose columns are missing different rows re-ranked over their
+    shared rows, one block per pair of missingness patterns. Column ranks from _rank can be passed in as RX and RY when they are already known. Returns the
+    coefficient matrix and the pairwise-complete counts.
+    """
+
+    symmetric = Y is None
+
+    RX = _rank(X) if RX is None else RX
+
+    if symmetric:
+        r, n = _pearson(RX)
+    else:
+        r, n = _pearson(RX, _rank(Y) if RY is None else RY)
+
+    # Ranks taken over different rows are not comparable, so columns are grouped by the rows they are missing and each
+    # pair of groups missing different rows is re-ranked, as one dense block, over the rows both groups keep
+    masks, px, py = __missingPatterns(X, Y)
+
+    groups_x = __patternGroups(px, len(masks))
+    groups_y = groups_x if symmetric else __patternGroups(py, len(masks))
+
+    Y = X if symmetric else Y
+
+    for a in range(len(masks)):
+        for b in range(a + 1 if symmetric else 0, len(masks)):
+            m = ~(masks[a] | masks[b])
+
+            # Pairs sharing fewer than two rows are already missing from the batch
+            if a == b or len(groups_x[a]) == 0 or len(groups_y[b]) == 0 or m.sum() < 2:
+                continue
+
+            block, _ = _pearson(_rank(X[np.ix_(m, groups_x[a])]), _rank(Y[np.ix_(m, groups_y[b])]))
+            r[np.ix_(groups_x[a], groups_y[b])] = block
+
+            if symmetric:
+                r[np.ix_(groups_y[b], groups_x[a])] = block.T
+
+    return r, n
+
+def _rank(X):
+    """Ranks each column of X (average ranks for ties), ignoring missing values."""
+
+    M = ~np.isnan(X)
+
+    if M.all():
+        return stats.rankdata(X, axis=0)
+
+    R = np.full(X.shape, np.nan)
+
+    for j in range(X.shape[1]):
+        R[M[:, j], j] = stats.rankdata(X[M[:, j], j])
+
+    return R
+
+def _kendall(X, Y=None, n_jobs=1):
+    """Kendall's tau-b of every column of X against every column of Y (X against itself if Y is None), using the
+    pairwise-complete observations of each column pair. Returns the coefficient and pvalue matrices, matching
+    scipy.stats.kendalltau.
+    """
+
+    symmetric = Y is None
+
+    if symmetric:
+        rows, cols = np.triu_indices(X.shape[1])
+    else:
+        rows, cols = [x.ravel() for x in np.indices((X.shape[1], Y.shape[1]))]
+
+    tau = np.full((X.shape[1], X.shape[1] if symmetric else Y.shape[1]), np.nan)
+    pval = np.full(tau.shape, np.nan)
+
+    tau[rows, cols], pval[rows, cols] = _kendallPairs(X, Y, rows, cols, n_jobs)
+
+    if symmetric:
+        tau[cols, rows] = tau[rows, cols]
+        pval[cols, rows] = pval[rows, cols]
+
+    return tau, pval
+
+def _kendallPairs(X, Y, rows, cols, n_jobs=1):
+    """Kendall's tau-b and pvalue for the column pairs (X[:, rows[k]], Y[:, cols[k]]), or pairs of columns of X if Y is
+    None. The pairs are split into chunks which are run across a pool of n_jobs processes.
+    """
+
+    chunks = [(rows[i:i + __KENDALL_CHUNK], cols[i:i + __KENDALL_CHUNK]) for i in range(0, len(rows), __KENDALL_CHUNK)]
+
+    masks, px, py = __missingPatterns(X, Y)
+
+    results = __runChunks(__kendallChunk, chunks, (X, X if Y is None else Y, masks, px, py), n_jobs)
+
+    if len(results) == 0:
+        return np.empty(0), np.empty(0)
+
+    tau, pval = [np.concatenate(x) for x in zip(*results)]
+
+    return tau, pval
+
+def _kendallBatch(x, y):
+    """Kendall's tau-b and its pvalue between each row of x and the same row of y, which must not contain missing
+    values. Discordant pairs are counted with a merge-sort inversion count, so each row costs O(n log n). Ties and the
+    choice between the exact and asymptotic pvalue follow scipy.stats.kendalltau.
+    """
+
+    size = x.shape[1]
+
+    # Sort on x, then on y within ties in x, so that only strictly decreasing y are discordant
+    order = np.lexsort((y, x), axis=-1)
+    xs = np.take_along_axis(x, order, axis=-1)
+    ys = np.take_along_axis(y, order, axis=-1)
+
+    ys_sorted = np.sort(y, axis=-1)
+
+    dis = __inversions(ys)
+    xtie, x0, x1 = __tieCounts(xs[:, 1:] != xs[:, :-1])
+    ytie, y0, y1 = __tieCounts(ys_sorted[:, 1:] != ys_sorted[:, :-1])
+    ntie, _, _ = __tieCounts((xs[:, 1:] != xs[:, :-1]) | (ys[:, 1:] != ys[:, :-1]))
+
+    tot = (size * (size - 1)) // 2
+    con_minus_dis = tot - xtie - ytie + ntie - 2 * dis
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = np.clip(con_minus_dis / np.sqrt(tot - xtie) / np.sqrt(tot - ytie), -1.0, 1.0)
+
+        m = size * (size - 1.)
+        var = ((m * (2 * size + 5) - x1 - y1) / 18 + (2 * xtie * ytie) / m + x0 * y0 / (9 * m * (size - 2)))
+        pval = 2 * stats.norm.sf(np.abs(con_minus_dis) / np.sqrt(var))
+
+    exact = (xtie == 0) & (ytie == 0) & ((size <= 33) | (np.minimum(dis, tot - dis) <= 1))
+
+    if exact.any():
+        pval[exact] = __kendallExact(size, np.minimum(dis, tot - dis)[exact])
+
+    undefined = (xtie == tot) | (ytie == tot)
+    tau[undefined] = np.nan
+    pval[undefined] = np.nan
+
+    return tau, pval
+
+def _pearsonFromSums(n, sx, sy, sxx, syy, sxy):
+    """Pearson correlation coefficients from pairwise-complete counts, sums, sums of squares and cross-products."""
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+
+        # A column that is constant over the shared rows leaves only rounding error behind, so treat it as zero variance
+        var_x = np.where(var_x > sxx * 1e-12, var_x, 0.0)
+        var_y = np.where(var_y > syy * 1e-12, var_y, 0.0)
+
+        r = cov / np.sqrt(var_x * var_y)
+
+    return np.where(n >= 2, np.clip(r, -1.0, 1.0), np.nan)
+
+def _pvalues(r, n):
+    """Two-sided pvalues for correlation coefficients from the t distribution with n - 2 degrees of freedom."""
+
+    df = n - 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.abs(r) * np.sqrt(df / ((1 - r) * (1 + r)))
+        pval = 2 * stats.t.sf(t, df)
+
+    # As with scipy, a correlation on two observations is always +/-1 with a pvalue of 1
+    return np.where((df == 0) & ~np.isnan(r), 1.0, pval)
+
+def _edgeNodes(df_data, peaktable):
+    """The edge indexes, names and labels of each df_data column, taken from the peaktable if one is given."""
+
+    names = np.asarray(df_data.columns, dtype=object)
+
+    if peaktable is None:
+        return np.arange(len(names)), names, names
+
+    if "Name" not in peaktable.columns or "Label" not in peaktable.columns:
+        print("Error: \"Name\" or \"Label\" column not in Peak Table. Please check your data.")
+        sys.exit()
+
+    positions = pd.Index(peaktable['Name']).get_indexer(names)
+
+    if (positions < 0).any():
+        print("Error: Not every DataTable column is in the Peak Table Name list. Please check your data.")
+        sys.exit()
+
+    return positions, names, np.asarray(peaktable['Label'], dtype=object)[positions]
+
+def __centre(X):
+
+    M = ~np.isnan(X)
+
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(np.where(M, X, np.nan), axis=0) if not M.all() else X.mean(axis=0)
+
+    Xc = np.where(M, X - np.nan_to_num(mean), 0.0)
+
+    return Xc, M
+
+def __weightedRanks(X, w):
+
+    # Average ranks of the columns of X when each row is repeated as many times as its weight. The rows are sorted once
+    # per column, and a row's rank is the weight of the rows below its run of ties plus the middle of the run.
+    size = X.shape[0]
+    order = np.argsort(X, axis=0, kind='stable')
+    values = np.take_along_axis(X, order, axis=0)
+
+    positions = np.arange(size)[:, None]
+    new_run = np.vstack([np.ones((1, X.shape[1]), dtype=bool), values[1:] != values[:-1]])
+    run_end = np.vstack([values[1:] != values[:-1], np.ones((1, X.shape[1]), dtype=bool)])
+
+    first = np.maximum.accumulate(np.where(new_run, positions, 0), axis=0).T[None]
+    last = np.minimum.accumulate(np.where(run_end, positions, size)[::-1], axis=0)[::-1].T[None]
+
+    cumulative = np.cumsum(np.take_along_axis(w, order.T[None], axis=-1), axis=-1)
+
+    below = np.where(first > 0, np.take_along_axis(cumulative, np.maximum(first - 1, 0).repeat(w.shape[0], axis=0), axis=-1), 0.0)
+    through = np.take_along_axis(cumulative, last.repeat(w.shape[0], axis=0), axis=-1)
+
+    ranks = np.empty(w.shape)
+    np.put_along_axis(ranks, order.T[None].repeat(w.shape[0], axis=0), below + (through - below + 1) / 2, axis=-1)
+
+    return ranks
+
+def __missingPatterns(X, Y=None):
+
+    missing = np.isnan(X) if Y is None else np.hstack([np.isnan(X), np.isnan(Y)])
+
+    masks, patterns = np.unique(missing.T, axis=0, return_inverse=True)
+    patterns = patterns.ravel()
+
+    if Y is None:
+        return masks, patterns, patterns
+
+    return masks, patterns[:X.shape[1]], patterns[X.shape[1]:]
+
+def __patternGroups(patterns, count):
+
+    order = np.argsort(patterns, kind='stable')
+
+    return np.split(order, np.cumsum(np.bincount(patterns, minlength=count))[:-1])
+
+__KENDALL_CHUNK = 10000
+
+# Number of dense float64 arrays of a tile's shape that are alive at once while a tile is being correlated
+__TILE_ARRAYS = 16
+
+def __condensed(X, correlationType, n_jobs, memory_limit):
+
+    p = X.shape[1]
+
+    if correlationType.lower() == "kendalltau":
+        rows, cols = np.triu_indices(p, 1)
+
+        corr, pval = _kendallPairs(X, None, rows, cols, n_jobs)
+        corr_diagonal, pval_diagonal = _kendallPairs(X, None, np.arange(p), np.arange(p), n_jobs)
+
+        return corr, pval, corr_diagonal, pval_diagonal
+
+    corr = np.empty(p * (p - 1) // 2)
+    pval = np.empty(p * (p - 1) // 2)
+    corr_diagonal = np.empty(p)
+    pval_diagonal = np.empty(p)
+
+    R = _rank(X) if correlationType.lower() == "spearman" else None
+
+    # Each tile of rows is correlated against its own and all later columns only, i.e. the upper triangle. The strictly
+    # upper entries of the tile are contiguous in the condensed (squareform) layout.
+    tile = max(1, __tileElements(memory_limit) // max(p, 1))
+
+    for start in range(0, p, tile):
+        stop = min(start + tile, p)
+
+        r, pv = __block(X, R, correlationType, start, stop, start, p, n_jobs)
+
+        upper = np.triu(np.ones(r.shape, dtype=bool), 1)
+        offset = start * p - start * (start + 1) // 2
+
+        corr[offset:offset + upper.sum()] = r[upper]
+        pval[offset:offset + upper.sum()] = pv[upper]
+
+        diagonal = np.arange(stop - start)
+        corr_diagonal[start:stop] = r[diagonal, diagonal]
+        pval_diagonal[start:stop] = pv[diagonal, diagonal]
+
+    return corr, pval, corr_diagonal, pval_diagonal
+
+def __memmap(X, correlationType, n_jobs, memmap_dir, memory_limit):
+
+    p = X.shape[1]
+
+    os.makedirs(memmap_dir, exist_ok=True)
+
+    corr_file = os.path.join(memmap_dir, "corr.npy")
+    pval_file = os.path.join(memmap_dir, "pval.npy")
+
+    # The matrices are written to new files and then renamed over any old ones, so memmaps still open on the old files are left intact
+    corr_partial = corr_file + ".partial"
+    pval_partial = pval_file + ".partial"
+
+    corr = np.lib.format.open_memmap(corr_partial, mode="w+", dtype=float, shape=(p, p))
+    pval = np.lib.format.open_memmap(pval_partial, mode="w+", dtype=float, shape=(p, p))
 
-            dat_pval = pd.DataFrame(np.column_stack(pvalList), columns=df_data.columns)
-            df_pval = pd.concat([df_pval, dat_pval]);
+    R = _rank(X) if correlationType.lower() == "spearman" else None
 
-    df_corr.index = df_data.columns
-    df_pval.index = df_data.columns
+    # Square tiles of the upper triangle are computed within the memory limit and mirrored into the lower triangle
+    tile = max(1, int(np.sqrt(__tileElements(memory_limit))))
 
-    return df_corr, df_pval
+    for start in tqdm(range(0, p, tile)):
+        stop = min(start + tile, p)
 
-def __checkData(df_data, correlationType):
+        for col_start in range(start, p, tile):
+            col_stop = min(col_start + tile, p)
+
+            r, pv = __block(X, R, correlationType, start, stop, col_start, col_stop, n_jobs)
+
+            corr[start:stop, col_start:col_stop] = r
+            pval[start:stop, col_start:col_stop] = pv
+
+            if col_start != start:
+                corr[col_start:col_stop, start:stop] = r.T
+                pval[col_start:col_stop, start:stop] = pv.T
+
+    corr.flush()
+    pval.flush()
+
+    del corr, pval
+
+    os.replace(corr_partial, corr_file)
+    os.replace(pval_partial, pval_file)
+
+    return np.load(corr_file, mmap_mode="r"), np.load(pval_file, mmap_mode="r")
+
+def __block(X, R, correlationType, start, stop, col_start, col_stop, n_jobs):
+
+    if correlationType.lower() == "kendalltau":
+        rows, cols = [x.ravel() for x in np.indices((stop - start, col_stop - col_start))]
+
+        tau, pval = _kendallPairs(X, None, rows + start, cols + col_start, n_jobs)
+
+        return tau.reshape(stop - start, col_stop - col_start), pval.reshape(stop - start, col_stop - col_start)
+
+    if correlationType.lower() == "pearson":
+        r, n = _pearson(X[:, start:stop], X[:, col_start:col_stop])
+    else:
+        r, n = _spearman(X[:, start:stop], X[:, col_start:col_stop], R[:, start:stop], R[:, col_start:col_stop])
+
+    # The tile is correlated as a rectangle, so entries on the matrix diagonal are set exactly as in the square case
+    rows, cols = np.nonzero(np.arange(start, stop)[:, None] == np.arange(col_start, col_stop)[None, :])
+    r[rows, cols] = np.where(np.isnan(r[rows, cols]), np.nan, 1.0)
+
+    return r, _pvalues(r, n)
+
+def __tileElements(memory_limit):
+
+    return int(memory_limit * 2 ** 20 / (8 * __TILE_ARRAYS))
+
+__poolData = None
+
+def __dense(X, Y, correlationType, n_jobs):
+
+    if correlationType.lower() == "pearson":
+        corr, n = _pearson(X, Y)
+        pval = _pvalues(corr, n)
+    elif correlationType.lower() == "spearman":
+        corr, n = _spearman(X, Y)
+        pval = _pvalues(corr, n)
+    else:
+        corr, pval = _kendall(X, Y, n_jobs=n_jobs)
+
+        Mx = (~np.isnan(X)).astype(float)
+        n = Mx.T @ (Mx if Y is None else (~np.isnan(Y)).astype(float))
+
+    return corr, pval, n
+
+def __results(index, columns, correlationType, ci_alpha, n, *matrices):
+
+    if ci_alpha is not None:
+        matrices = matrices + __intervals(matrices[0], n, correlationType, ci_alpha)
+
+    return tuple(pd.DataFrame(x, index=index, columns=columns) for x in matrices)
+
+def __intervals(r, n, correlationType, ci_alpha):
+
+    # Standard errors of the Fisher z transformed coefficient, with the Fieller et al. (1957) variances for the rank
+    # correlations
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if correlationType.lower() == "pearson":
+            se = 1 / np.sqrt(n - 3)
+        elif correlationType.lower() == "spearman":
+            se = np.sqrt(1.06 / (n - 3))
+        else:
+            se = np.sqrt(0.437 / (n - 4))
+
+        z = np.arctanh(r)
+        margin = stats.norm.ppf(1 - ci_alpha / 2) * se
+
+        lower = np.where(np.isfinite(se), np.tanh(z - margin), np.nan)
+        upper = np.where(np.isfinite(se), np.tanh(z + margin), np.nan)
+
+    return lower, upper
+
+# The smallest number of null partial correlations pooled for the partial pvalues, and the most permutations run to reach it
+__PARTIAL_NULL_SIZE = 100000
+__PARTIAL_PERMUTATIONS = 1000
+
+def __partial(X, correlationType, permutations, seed):
+
+    if correlationType.lower() == "spearman":
+        X = _rank(X)
+
+    n, p = X.shape
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Z = np.nan_to_num((X - X.mean(axis=0)) / X.std(axis=0))
+
+    # A single shrinkage estimate of the precision matrix gives every partial correlation at once
+    lw = LedoitWolf(assume_centered=True).fit(Z)
+    corr = __precisionCorr(lw.precision_)
+
+    constant = np.std(X, axis=0) == 0
+    varying = np.flatnonzero(~constant)
+
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+
+    # Permuting every column on its own gives data with no partial correlations. Refitted at the shrinkage of the
+    # observed data, each permutation gives a null draw of every pair, and the pairs are pooled into one null
+    # distribution of the shrunk coefficients, which exists with fewer samples than columns
+    pairs = len(varying) * (len(varying) - 1) // 2
+
+    if pairs == 0:
+        return corr, np.full((p, p), np.nan)
+
+    if permutations == 0:
+        permutations = int(min(__PARTIAL_PERMUTATIONS, max(1, math.ceil(__PARTIAL_NULL_SIZE / pairs))))
+
+    rng = np.random.default_rng(seed)
+    upper = np.triu_indices(len(varying), 1)
+
+    Z = Z[:, varying]
+    null = np.empty(permutations * pairs)
+
+    for b in tqdm(range(permutations)):
+        Zb = rng.permuted(Z, axis=0)
+
+        precision = np.linalg.inv(shrunk_covariance(Zb.T @ Zb / n, lw.shrinkage_))
+        null[b * pairs:(b + 1) * pairs] = np.abs(__precisionCorr(precision)[upper])
+
+    null.sort()
+
+    with np.errstate(invalid='ignore'):
+        pval = (len(null) - np.searchsorted(null, np.abs(corr) - 1e-12, side='left') + 1) / (len(null) + 1)
+
+    return corr, np.where(np.isnan(corr), np.nan, pval)
+
+def __precisionCorr(precision):
+
+    scale = np.sqrt(np.diag(precision))
+
+    corr = np.clip(-precision / np.outer(scale, scale), -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+
+    return corr
+
+def __crossBlocks(X, blocks, block_names, correlationType, n_jobs):
+
+    corr = np.full((X.shape[1], X.shape[1]), np.nan)
+    pval = np.full((X.shape[1], X.shape[1]), np.nan)
+    n = np.zeros((X.shape[1], X.shape[1]))
+
+    # Each pair of blocks is correlated once as a rectangle and mirrored, and the pairs within a block are never computed
+    for i, block in enumerate(block_names):
+        for other in block_names[i + 1:]:
+            rows = np.flatnonzero(blocks == block)
+            cols = np.flatnonzero(blocks == other)
+
+            r, pv, count = __dense(X[:, rows], X[:, cols], correlationType, n_jobs)
+
+            corr[np.ix_(rows, cols)] = r
+            pval[np.ix_(rows, cols)] = pv
+            n[np.ix_(rows, cols)] = count
+            corr[np.ix_(cols, rows)] = r.T
+            pval[np.ix_(cols, rows)] = pv.T
+            n[np.ix_(cols, rows)] = count.T
+
+    return corr, pval, n
+
+__PERMUTATION_CHUNK = 20
+
+def __permutation(X, Y, correlationType, permutations, seed, n_jobs):
+
+    symmetric = Y is None
+    Y = X if symmetric else Y
+
+    RX = _rank(X) if correlationType.lower() == "spearman" else None
+    RY = (RX if symmetric else _rank(Y)) if correlationType.lower() == "spearman" else None
+
+    corr, n = __permutedCorr(X, Y, RX, RY, correlationType, np.arange(Y.shape[0]))
+
+    if symmetric:
+        corr[np.diag_indices_from(corr)] = np.where(np.isnan(np.diag(corr)), np.nan, 1.0)
+
+    # Permutations run in chunks of a fixed size with their own spawned seeds, so the result does not depend on n_jobs
+    sizes = [min(__PERMUTATION_CHUNK, permutations - i) for i in range(0, permutations, __PERMUTATION_CHUNK)]
+    chunks = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+    results = __runChunks(__permutationChunk, chunks, (X, Y, RX, RY, correlationType, corr, symmetric), n_jobs)
+
+    exceed = sum(x[0] for x in results)
+    maxima = np.sort(np.concatenate([x[1] for x in results]))
+
+    if symmetric:
+        exceed = exceed + exceed.T
+
+    with np.errstate(invalid='ignore'):
+        pval = (exceed + 1) / (permutations + 1)
+        pval_maxT = (len(maxima) - np.searchsorted(maxima, np.abs(corr) - 1e-12, side='left') + 1) / (permutations + 1)
+
+    pval = np.where(np.isnan(corr), np.nan, pval)
+    pval_maxT = np.where(np.isnan(corr), np.nan, pval_maxT)
+
+    return corr, pval, pval_maxT, n
+
+def __permutationChunk(chunk):
+
+    size, seed = chunk
+    X, Y, RX, RY, correlationType, corr, symmetric = __poolData
+
+    rng = np.random.default_rng(seed)
+
+    exceed = np.zeros(corr.shape)
+    maxima = np.empty(size)
+
+    for b in range(size):
+        # Permuting the samples of Y against X breaks every pair's association at once, so each permutation is one
+        # batched correlation of the whole matrix
+        null = np.abs(__permutedCorr(X, Y, RX, RY, correlationType, rng.permutation(Y.shape[0]))[0])
+
+        # A symmetric matrix holds each pair twice, as (i, j) and (j, i), so only the upper triangle counts as a test
+        if symmetric:
+            null[np.tril_indices_from(null)] = np.nan
+
+        with np.errstate(invalid='ignore'):
+            exceed += null >= np.abs(corr) - 1e-12
+
+        maxima[b] = np.nanmax(null) if not np.isnan(null).all() else 0.0
+
+    return exceed, maxima
+
+def __permutedCorr(X, Y, RX, RY, correlationType, order):
+
+    if correlationType.lower() == "pearson":
+        return _pearson(X, Y[order])
+
+    return _spearman(X, Y[order], RX, RY[order])
+
+def __runChunks(function, chunks, data, n_jobs):
+
+    # The data is handed to each worker process once, rather than pickled with every chunk
+    if n_jobs == 1:
+        __poolInit(*data)
+        return [function(chunk) for chunk in tqdm(chunks)]
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=__poolInit, initargs=data) as pool:
+        return list(tqdm(pool.map(function, chunks), total=len(chunks)))
+
+def __poolInit(*data):
+
+    global __poolData
+
+    __poolData = data
+
+def __kendallChunk(chunk):
+
+    rows, cols = chunk
+    X, Y, masks, px, py = __poolData
+
+    tau = np.full(len(rows), np.nan)
+    pval = np.full(len(rows), np.nan)
+
+    # Pairs whose columns are missing the same rows share every kept row, so each pair of missingness patterns is
+    # masked once and its pairs are stacked and run as batches
+    key = px[rows] * len(masks) + py[cols]
+    order = np.argsort(key, kind='stable')
+
+    for pairs in np.split(order, np.flatnonzero(np.diff(key[order])) + 1):
+        if len(pairs) == 0:
+            continue
+
+        m = ~(masks[px[rows[pairs[0]]]] | masks[py[cols[pairs[0]]]])
+        batch = max(1, 2 ** 20 // max(m.sum(), 1))
+
+        for i in range(0, len(pairs), batch):
+            k = pairs[i:i + batch]
+            tau[k], pval[k] = _kendallBatch(X[np.ix_(m, rows[k])].T, Y[np.ix_(m, cols[k])].T)
+
+    return tau, pval
+
+def __inversions(a):
+
+    rows, n = a.shape
+    size = 1 << max(n - 1, 0).bit_length()
+
+    # Pad to a power of two with values that sort last, then merge runs of doubling width. At each merge, every element
+    # from the right run is inverted with the elements of the left run still to come after it in the merged order.
+    a = np.hstack([a, np.full((rows, size - n), np.inf)])
+    count = np.zeros(rows)
+
+    width = 1
+    while width < size:
+        runs = a.reshape(rows, size // (2 * width), 2 * width)
+        order = np.argsort(runs, axis=-1, kind='stable')
+
+        left = order < width
+        left_before = np.cumsum(left, axis=-1) - left
+
+        count += np.where(left, 0, width - left_before).sum(axis=(1, 2))
+
+        a = np.take_along_axis(runs, order, axis=-1).reshape(rows, size)
+        width *= 2
+
+    return count
+
+def __tieCounts(changes):
+
+    rows, n = changes.shape[0], changes.shape[1] + 1
+
+    starts = np.flatnonzero(np.hstack([np.ones((rows, 1), dtype=bool), changes]))
+    cnt = np.diff(np.append(starts, rows * n)).astype(float)
+    row = starts // n
+
+    tie = np.bincount(row, cnt * (cnt - 1) / 2, minlength=rows)
+    t0 = np.bincount(row, cnt * (cnt - 1.) * (cnt - 2), minlength=rows)
+    t1 = np.bincount(row, cnt * (cnt - 1.) * (2 * cnt + 5), minlength=rows)
+
+    return tie, t0, t1
+
+def __kendallExact(n, c):
+
+    c = np.asarray(c, dtype=np.int64)
+
+    if n <= 2:
+        return np.ones(len(c))
+
+    if n > 33:
+        # Beyond 33 observations the exact pvalue is only used when there are at most one concordant or discordant pair
+        return np.where(c == 0, 2.0 / math.factorial(n) if n < 171 else 0.0,
+                        2.0 / math.factorial(n - 1) if n < 172 else 0.0)
+
+    # Counts of permutations of n with at most c inversions, see Kendall, "Rank Correlation Methods" (1970)
+    new = np.zeros(c.max() + 2)
+    new[0:2] = 1.0
+    for j in range(3, n + 1):
+        new = np.cumsum(new)
+        if j < len(new):
+            new[j:] -= new[:len(new) - j]
+
+    prob = 2.0 * np.cumsum(new)[c] / math.factorial(n)
+    prob[4 * c == n * (n - 1)] = 1.0
+
+    return np.clip(prob, 0, 1)
+
+def __checkEdgeParams(df_data, filter_type, hard_threshold, sign, peaktable):
+
+    if filter_type.lower() not in ["pvalue", "score"]:
+        print("Error: Filter type not valid. Choose either \"Pvalue\" or \"Score\".")
+        sys.exit()
+
+    if not isinstance(hard_threshold, (int, float)):
+        print("Error: Hard threshold is not valid. Choose a float or integer value.")
+        sys.exit()
+
+    if sign.lower() not in ["pos", "neg", "both"]:
+        print("Error: Sign is not valid. Choose either \"pos\" or \"neg\" or \"both\".")
+        sys.exit()
+
+    indexes, names, labels = _edgeNodes(df_data, peaktable)
+
+    return filter_type, hard_threshold, sign, indexes, names, labels
+
+def __checkCrossData(df_data, df_data_y, blocks, condensed, memmap_dir):
+
+    if df_data_y is None and blocks is None:
+        return df_data_y, blocks
+
+    if condensed or memmap_dir is not None:
+        print("Error: df_data_y and blocks cannot be used with condensed or memmap_dir. Please check your parameters.")
+        sys.exit()
+
+    if df_data_y is not None and blocks is not None:
+        print("Error: df_data_y and blocks cannot be used together. Choose one or the other.")
+        sys.exit()
+
+    if df_data_y is not None:
+        if not isinstance(df_data_y, pd.DataFrame):
+            print("Error: df_data_y is not a dataframe. Please check your data.")
+            sys.exit()
+
+        if len(df_data_y.index) != len(df_data.index):
+            print("Error: df_data and df_data_y do not have the same number of samples (rows). Please check your data.")
+            sys.exit()
+
+        return df_data_y.astype(float), blocks
+
+    if isinstance(blocks, pd.Series) and set(df_data.columns).issubset(set(blocks.index)):
+        blocks = blocks.reindex(df_data.columns)
+
+    blocks = np.asarray(blocks)
+
+    if len(blocks) != len(df_data.columns):
+        print("Error: blocks does not have a block for every df_data column. Please check your data.")
+        sys.exit()
+
+    if len(pd.unique(blocks)) < 2:
+        print("Error: blocks needs at least two different blocks. Please check your data.")
+        sys.exit()
+
+    return df_data_y, blocks
+
+def __checkPermutations(correlationType, permutations, blocks, condensed, memmap_dir):
+
+    if not isinstance(permutations, int) or permutations < 0:
+        print("Error: permutations is not valid. Choose a positive integer, or 0 for no permutations.")
+        sys.exit()
+
+    if permutations > 0:
+        if correlationType.lower() == "kendalltau":
+            print("Error: permutations are only available for \"Pearson\" or \"Spearman\".")
+            sys.exit()
+
+        if condensed or memmap_dir is not None or (blocks is not None and len(pd.unique(blocks)) > 2):
+            print("Error: permutations cannot be used with condensed, memmap_dir or more than two blocks. Please check your parameters.")
+            sys.exit()
+
+    return permutations
+
+def __checkIntervals(ci_alpha, condensed, memmap_dir):
+
+    if ci_alpha is not None:
+        if not isinstance(ci_alpha, float) or not 0 < ci_alpha < 1:
+            print("Error: ci_alpha is not valid. Choose a float between 0 and 1, or None.")
+            sys.exit()
+
+        if condensed or memmap_dir is not None:
+            print("Error: ci_alpha cannot be used with condensed or memmap_dir. Please check your parameters.")
+            sys.exit()
+
+    return ci_alpha
+
+def __checkPartial(df_data, correlationType, partial, condensed, memmap_dir, df_data_y, blocks, permutations, ci_alpha):
+
+    if not type(partial) == bool:
+        print("Error: partial is not valid. Choose either \"True\" or \"False\".")
+        sys.exit()
+
+    if partial:
+        if correlationType.lower() == "kendalltau":
+            print("Error: partial correlations are only available for \"Pearson\" or \"Spearman\".")
+            sys.exit()
+
+        if condensed or memmap_dir is not None or df_data_y is not None or blocks is not None or ci_alpha is not None:
+            print("Error: partial cannot be used with condensed, memmap_dir, df_data_y, blocks or ci_alpha. Please check your parameters.")
+            sys.exit()
+
+        if df_data.isnull().values.any():
+            print("Error: partial correlations need data without missing values. Please impute your data first.")
+            sys.exit()
+
+    return partial
+
+def __checkData(df_data, correlationType, n_jobs, condensed, memmap_dir, memory_limit, overwrite):
 
     if correlationType.lower() not in ["pearson", "spearman", "kendalltau"]:
         print("Error: Correlation type not valid. Choose either \"Pearson\", \"Spearman\" or \"KendallTau\".")
@@ -69,4 +1032,36 @@ def __checkData(df_data, correlationType):
         print("Error: A dataframe was not entered. Please check your data.")
         sys.exit()
 
-    return df_data, correlationType
\ No newline at end of file
+    if not isinstance(n_jobs, int) or n_jobs == 0 or n_jobs < -1:
+        print("Error: n_jobs is not valid. Choose a positive integer or -1 to use all processors.")
+        sys.exit()
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if not type(condensed) == bool:
+        print("Error: condensed is not valid. Choose either \"True\" or \"False\".")
+        sys.exit()
+
+    if memmap_dir is not None:
+        if not isinstance(memmap_dir, str):
+            print("Error: memmap_dir is not valid. Choose a directory path or None.")
+            sys.exit()
+
+        if condensed:
+            print("Error: condensed and memmap_dir cannot be used together. Choose one or the other.")
+            sys.exit()
+
+        if not type(overwrite) == bool:
+            print("Error: overwrite is not valid. Choose either \"True\" or \"False\".")
+            sys.exit()
+
+        if not overwrite and any(os.path.exists(os.path.join(memmap_dir, file)) for file in ["corr.npy", "pval.npy"]):
+            print("Error: memmap_dir already contains \"corr.npy\" or \"pval.npy\". Choose another directory or set overwrite to \"True\".")
+            sys.exit()
+
+    if not isinstance(memory_limit, (int, float)) or memory_limit <= 0:
+        print("Error: memory_limit is not valid. Choose a positive number of megabytes.")
+        sys.exit()
+
+    return df_data, correlationType, n_jobs, condensed, memmap_dir, memory_limit
@@ -0,0 +1,205 @@
+import sys
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from .corrAnalysis import _pearson, _pearsonPairs, _pvalues, _edgeNodes
+
+def corrNeighbours(df_data, k=10, sign='both', peaktable=None, n_tables=16, n_bits=None, recall_sample=100, seed=None):
+    """Finds the k most strongly Pearson correlated neighbours of every column of a matrix of values, without computing
+    the full correlation matrix. The standardised columns are hashed with random hyperplanes (sign locality-sensitive
+    hashing), columns sharing a hash (or, for negative correlations, sharing the complement of a hash) become candidate
+    pairs, and only the candidate pairs are correlated exactly.
+
+        Parameters
+        ----------
+        df_data : A Pandas dataframe matrix of values
+        k : The number of neighbours to keep for each column (default: 10)
+        sign : The sign of the correlations to keep ('pos', 'neg' or 'both', ranking on the absolute correlation) (default: 'both')
+        peaktable : Pandas dataframe containing peak data with 'Name' and 'Label', used for the edge indexes and labels (default: None uses the df_data column positions and names)
+        n_tables : The number of hash tables. More tables find more neighbours at the cost of more candidate pairs (default: 16)
+        n_bits : The number of hyperplanes in each hash. More bits give smaller buckets and fewer candidate pairs (default: None chooses buckets of about 4k columns)
+        recall_sample : The number of columns whose exact neighbours are computed to estimate the recall (default: 100)
+        seed : The random seed for the hyperplanes and the recall sample (default: None)
+
+        Returns
+        -------
+        edges : Pandas dataframe of the edges between each column and its neighbours, in the column layout of Edge.getEdges()
+        recall : The estimated fraction of the exact k nearest neighbours that were found
+        sparse_corr : A symmetric scipy sparse matrix of the edge scores, with the df_data columns as rows and columns, to pass to Edge or Network as the datatable
+        sparse_pval : A scipy sparse matrix of the edge pvalues, storing the same pairs as sparse_corr, to pass to Edge or Network as the pvalues
+        names : The df_data column names, to pass to Edge or Network as the names of the sparse matrices
+    """
+
+    df_data, k, sign, n_tables, n_bits, recall_sample = __checkData(df_data, k, sign, n_tables, n_bits, recall_sample)
+    indexes, names, labels = _edgeNodes(df_data, peaktable)
+
+    X = df_data.values.astype(float)
+    p = X.shape[1]
+
+    if n_bits is None:
+        n_bits = int(max(1, min(62, round(np.log2(max(p / (4. * k), 2))))))
+
+    rng = np.random.default_rng(seed)
+
+    rows, cols = __candidates(X, n_tables, n_bits, sign, rng)
+
+    r, n = _pearsonPairs(X, rows, cols)
+
+    source, target, value = __topK(rows, cols, __rankValue(r, sign), k)
+
+    # An edge is kept when either of its columns has the other as a neighbour
+    pairs = np.unique(np.minimum(source, target) * p + np.maximum(source, target))
+    candidates = rows * p + cols
+    position = np.searchsorted(candidates, pairs)
+
+    rows, cols, score, n = rows[position], cols[position], r[position], n[position]
+
+    edges = pd.DataFrame({'start_index': indexes[rows], 'start_name': names[rows], 'start_label': labels[rows],
+                          'end_index': indexes[cols], 'end_name': names[cols], 'end_label': labels[cols],
+                          'score': score, 'sign': np.sign(score), 'pvalue': _pvalues(score, n)})
+
+    recall = __recall(X, source, target, k, sign, recall_sample, rng)
+
+    # Both triangles of each edge are stored, and a score of zero is kept as a stored value, so the two matrices
+    # hold exactly the edges of the table
+    sparse_rows, sparse_cols = np.r_[rows, cols], np.r_[cols, rows]
+
+    sparse_corr = scipy.sparse.csr_matrix((np.r_[score, score], (sparse_rows, sparse_cols)), shape=(p, p))
+    sparse_pval = scipy.sparse.csr_matrix((np.tile(edges['pvalue'].values, 2), (sparse_rows, sparse_cols)), shape=(p, p))
+
+    return edges, recall, sparse_corr, sparse_pval, np.asarray(df_data.columns)
+
+def __candidates(X, n_tables, n_bits, sign, rng):
+
+    p = X.shape[1]
+
+    M = ~np.isnan(X)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nan_to_num(np.nanmean(np.where(M, X, np.nan), axis=0))
+        Z = np.where(M, X - mean, 0.0)
+        norm = np.sqrt((Z * Z).sum(axis=0))
+        Z = Z / np.where(norm > 0, norm, 1.0)
+
+    # Constant columns have no correlations and would all share one hash
+    usable = np.flatnonzero(norm > 0)
+
+    weights = 2 ** np.arange(n_bits, dtype=np.int64)
+    complement = 2 ** n_bits - 1
+
+    keys = []
+
+    for _ in range(n_tables):
+        codes = ((Z[:, usable].T @ rng.standard_normal((X.shape[0], n_bits))) > 0) @ weights
+
+        order = np.argsort(codes, kind='stable')
+        bucket_codes, starts, sizes = np.unique(codes[order], return_index=True, return_counts=True)
+        buckets = dict(zip(bucket_codes, zip(starts, sizes)))
+
+        for code, (start, size) in buckets.items():
+            members = usable[order[start:start + size]]
+
+            if sign != "neg" and size > 1:
+                i, j = np.triu_indices(size, 1)
+                keys.append(__pairKeys(members[i], members[j], p))
+
+            # A negative correlation flips every hyperplane side, so it lands in the complement bucket
+            opposite = complement ^ code
+
+            if sign != "pos" and code < opposite and opposite in buckets:
+                opposite_start, opposite_size = buckets[opposite]
+                i, j = [x.ravel() for x in np.meshgrid(members, usable[order[opposite_start:opposite_start + opposite_size]], indexing='ij')]
+                keys.append(__pairKeys(i, j, p))
+
+    keys = np.unique(np.concatenate(keys)) if len(keys) > 0 else np.empty(0, dtype=np.int64)
+
+    return keys // p, keys % p
+
+def __pairKeys(i, j, p):
+
+    return np.minimum(i, j).astype(np.int64) * p + np.maximum(i, j)
+
+def __rankValue(r, sign):
+
+    if sign == "pos":
+        value = r
+    elif sign == "neg":
+        value = -r
+    else:
+        value = np.abs(r)
+
+    return np.where(np.isnan(value) | (value <= 0), -np.inf, value)
+
+def __topK(rows, cols, value, k):
+
+    source = np.concatenate([rows, cols])
+    target = np.concatenate([cols, rows])
+    value = np.concatenate([value, value])
+
+    keep = value > -np.inf
+    source, target, value = source[keep], target[keep], value[keep]
+
+    order = np.lexsort((-value, source))
+    source, target, value = source[order], target[order], value[order]
+
+    # Position of each candidate within its column's list, strongest first
+    starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]])
+    rank = np.arange(len(source)) - np.repeat(starts, np.diff(np.r_[starts, len(source)]))
+
+    keep = rank < k
+
+    return source[keep], target[keep], value[keep]
+
+def __recall(X, source, target, k, sign, recall_sample, rng):
+
+    p = X.shape[1]
+
+    if recall_sample == 0 or p < 2:
+        return np.nan
+
+    sample = rng.choice(p, min(recall_sample, p), replace=False)
+
+    r, _ = _pearson(X[:, sample], X)
+    value = __rankValue(r, sign)
+    value[np.arange(len(sample)), sample] = -np.inf
+
+    found = 0
+    total = 0
+
+    for i, column in enumerate(sample):
+        exact = np.argsort(-value[i], kind='stable')[:k]
+        exact = exact[value[i, exact] > -np.inf]
+
+        found += np.isin(exact, target[source == column]).sum()
+        total += len(exact)
+
+    return found / total if total > 0 else np.nan
+
+def __checkData(df_data, k, sign, n_tables, n_bits, recall_sample):
+
+    if not isinstance(df_data, pd.DataFrame):
+        print("Error: A dataframe was not entered. Please check your data.")
+        sys.exit()
+
+    if not isinstance(k, int) or k < 1:
+        print("Error: k is not valid. Choose a positive integer.")
+        sys.exit()
+
+    if sign.lower() not in ["pos", "neg", "both"]:
+        print("Error: Sign is not valid. Choose either \"pos\" or \"neg\" or \"both\".")
+        sys.exit()
+
+    if not isinstance(n_tables, int) or n_tables < 1:
+        print("Error: n_tables is not valid. Choose a positive integer.")
+        sys.exit()
+
+    if n_bits is not None:
+        if not isinstance(n_bits, int) or n_bits < 1 or n_bits > 62:
+            print("Error: n_bits is not valid. Choose an integer between 1 and 62, or None.")
+            sys.exit()
+
+    if not isinstance(recall_sample, int) or recall_sample < 0:
+        print("Error: recall_sample is not valid. Choose a positive integer, or 0 to skip the recall estimate.")
+        sys.exit()
+
+    return df_data, k, sign.lower(), n_tables, n_bits, recall_sample